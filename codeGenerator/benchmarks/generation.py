@@ -0,0 +1,202 @@
+"""
+Throughput benchmark of the generator over a fixed corpus of seeds.
+
+Every profile of GenConfig is run in a fresh process, which generates and
+translates the programs of the seeds for both languages with the function of
+the server (generate_program).
+The report is a JSON document with, per profile, the programs generated per
+second, the p50/p95/p99 latency of a program (the fastest of --repeat runs),
+the peak RSS of the process and the total size of the generated programs.
+Seeds that fail or time out are counted, but not measured.
+
+With --baseline, the report is compared against a stored report, and the
+command fails if a profile has regressed by more than --tolerance.
+benchmarks/baseline.json is the report of the default arguments; the
+timings depend on the machine, so compare against a baseline measured on
+the same one.
+
+Usage (from the codeGenerator directory):
+    python3 -m benchmarks.generation [--seeds 1-20] [--profiles default,deep]
+        [--repeat N] [--output report.json] [--baseline baseline.json]
+        [--tolerance 0.1]
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PROFILES = {
+    'default': {},
+    'deep': {
+        'limits': {
+            'max_depth': 4
+        }
+    },
+    'wide': {
+        'limits': {
+            'min_top_level': 15,
+            'max_top_level': 15
+        }
+    },
+    'generic-heavy': {
+        'limits': {
+            'max_type_params': 2
+        },
+        'prob': {
+            'parameterized_functions': 0.6
+        }
+    },
+}
+LANGUAGES = ('kotlin', 'java')
+# Metrics compared against the baseline, and whether higher is better.
+METRICS = {
+    'programs_per_sec': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'peak_rss_kb': False,
+}
+
+
+def _parse_seeds(seeds):
+    if '-' in seeds:
+        first, last = map(int, seeds.split('-'))
+        return list(range(first, last + 1))
+    return [int(seed) for seed in seeds.split(',')]
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seeds", default="1-20",
+                        help="a range (1-20) or a list (1,4,7) of seeds")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=int, default=10,
+                        help="seconds per program")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against this report")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed relative regression (default: 0.1)")
+    args = parser.parse_args()
+    # The generator parses the command line (src.args) when it is imported.
+    del sys.argv[1:]
+    return args
+
+
+ARGS = _parse_args()
+
+from src.generators import GenerationTimeout  # noqa: E402
+from src.generators.config import cfg  # noqa: E402
+from src.server.sever_class import generate_program  # noqa: E402
+
+
+def _timed_generate(language, seed, timeout):
+    """The text of a program (None if it fails) and its latency, or
+    GenerationTimeout after timeout seconds."""
+    start = time.perf_counter()
+    text = generate_program(language, seed, deadline=time.time() + timeout)
+    return text, time.perf_counter() - start
+
+
+def run_profile(profile, seeds, timeout, repeat):
+    """Run in a fresh process: the config and the peak RSS are its own."""
+    cfg.json_config(PROFILES[profile])
+    latencies, size, failed, timeouts = [], 0, 0, 0
+    for seed in seeds:
+        for language in LANGUAGES:
+            try:
+                text, latency = _timed_generate(language, seed, timeout)
+            except GenerationTimeout:
+                timeouts += 1
+                continue
+            if text is None:
+                failed += 1
+                continue
+            for _ in range(repeat - 1):
+                latency = min(latency,
+                              _timed_generate(language, seed, timeout)[1])
+            latencies.append(latency)
+            size += len(text.encode())
+    # The seeds that fail or time out are not part of the throughput.
+    return {
+        'programs': len(latencies),
+        'failed': failed,
+        'timeouts': timeouts,
+        'programs_per_sec': len(latencies) / sum(latencies)
+        if latencies else 0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'output_bytes': size,
+    }
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile, 0 for no values."""
+    if not values:
+        return 0
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def compare(report, baseline, tolerance):
+    """Return the regressions of report against baseline, as messages."""
+    regressions = []
+    for profile, result in report['profiles'].items():
+        old = baseline['profiles'].get(profile)
+        if old is None:
+            continue
+        if result['output_bytes'] != old['output_bytes'] or \
+                result['programs'] != old['programs']:
+            print(f"{profile}: the generated programs differ from the "
+                  f"baseline, the timings are not comparable",
+                  file=sys.stderr)
+        for metric, higher_is_better in METRICS.items():
+            if not old[metric]:
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            if higher_is_better:
+                change = -change
+            line = "{}: {} {:.2f} -> {:.2f} ({:+.1%})".format(
+                profile, metric, old[metric], result[metric],
+                -change if higher_is_better else change)
+            if change > tolerance:
+                regressions.append(line)
+            print(line, file=sys.stderr)
+    return regressions
+
+
+def main(args):
+    seeds = _parse_seeds(args.seeds)
+    report = {'seeds': seeds, 'languages': list(LANGUAGES), 'profiles': {}}
+    for profile in args.profiles.split(","):
+        with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("fork")) as executor:
+            report['profiles'][profile] = executor.submit(
+                run_profile, profile, seeds, args.timeout,
+                args.repeat).result()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as out:
+            out.write(text + "\n")
+    print(text)
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("Regressions over {:.0%}:".format(args.tolerance),
+                  file=sys.stderr)
+            for line in regressions:
+                print("  " + line, file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(ARGS)
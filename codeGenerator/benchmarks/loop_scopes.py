@@ -0,0 +1,132 @@
+"""
+Scaling benchmark for the loop-scope queries of the generator.
+
+Every function body that contains a loop looks up the variables declared in
+the loop scopes of the function. The benchmark generates programs of growing
+size, by raising max_top_level and max_depth in GenConfig, and answers each of
+these queries both with the child-namespace index of the context and with a
+scan of all the declarations of the program (the behaviour before the index).
+Both answers must be the same; the time spent on each is reported.
+
+Usage (from the codeGenerator directory):
+    python3 -m benchmarks.loop_scopes [--sizes 5:3,20:3,50:4] [--seeds N]
+"""
+import argparse
+import signal
+import sys
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5:3,20:3,50:3,50:4",
+                        help="max_top_level:max_depth pairs")
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--timeout", type=int, default=20,
+                        help="seconds per program")
+    args = parser.parse_args()
+    # The generator parses the command line (src.args) when it is imported.
+    del sys.argv[1:]
+    return args
+
+
+ARGS = _parse_args()
+
+from src import utils  # noqa: E402
+from src.generators import Generator  # noqa: E402
+from src.generators.config import cfg  # noqa: E402
+from src.ir.context import Context  # noqa: E402
+
+
+class Timeout(Exception):
+    pass
+
+
+def _timeout(*_):
+    raise Timeout()
+
+
+def scan_child_declarations(context, namespace, only_loops=False):
+    """Context.get_child_declarations as a scan of all the declarations."""
+    return [
+        decl for decl, ns in context._namespaces.items()
+        if ns[:-1] == namespace and (not only_loops or 'loop' in ns[-1])
+    ]
+
+
+class QueryTimer():
+    """Answer the child declaration queries in both ways and time them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.scan = 0
+        self.index = 0
+        self._get_child_declarations = Context.get_child_declarations
+
+    def __enter__(self):
+        timer = self
+
+        def timed(context, namespace, only_loops=False):
+            start = time.perf_counter()
+            scanned = scan_child_declarations(context, namespace, only_loops)
+            middle = time.perf_counter()
+            decls = timer._get_child_declarations(context, namespace,
+                                                  only_loops)
+            timer.scan += middle - start
+            timer.index += time.perf_counter() - middle
+            timer.queries += 1
+            assert decls == scanned
+            return decls
+
+        Context.get_child_declarations = timed
+        return self
+
+    def __exit__(self, *_):
+        Context.get_child_declarations = self._get_child_declarations
+
+
+def _generate(seed, timeout):
+    utils.randomUtil.reset_word_pool()
+    utils.randomUtil.reset_random(seed)
+    generator = Generator(language="kotlin")
+    signal.alarm(timeout)
+    try:
+        generator.generate()
+        return len(generator.context._namespaces)
+    except Exception:
+        # Either a timeout or a failure of the generator for this seed.
+        return None
+    finally:
+        signal.alarm(0)
+
+
+def main(args):
+    signal.signal(signal.SIGALRM, _timeout)
+
+    print("{:<10}{:>10}{:>10}{:>10}{:>12}{:>12}{:>10}".format(
+        "size", "programs", "decls", "queries", "scan (ms)", "index (ms)",
+        "speed-up"))
+    limits = cfg.limits.max_top_level, cfg.limits.max_depth
+    try:
+        for size in args.sizes.split(","):
+            top_level, depth = map(int, size.split(":"))
+            cfg.limits.max_top_level = top_level
+            cfg.limits.max_depth = depth
+            decls = []
+            with QueryTimer() as timer:
+                for seed in range(1, args.seeds + 1):
+                    nr_decls = _generate(seed, args.timeout)
+                    if nr_decls is not None:
+                        decls.append(nr_decls)
+            print("{:<10}{:>10}{:>10.0f}{:>10}{:>12.2f}{:>12.2f}{:>10}".format(
+                size, len(decls),
+                sum(decls) / len(decls) if decls else 0, timer.queries,
+                timer.scan * 1e3, timer.index * 1e3,
+                "{:.1f}x".format(timer.scan / timer.index)
+                if timer.index else "-"))
+    finally:
+        cfg.limits.max_top_level, cfg.limits.max_depth = limits
+
+
+if __name__ == "__main__":
+    main(ARGS)
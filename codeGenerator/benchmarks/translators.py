@@ -0,0 +1,124 @@
+"""
+End-to-end benchmark of the Kotlin and the Java translators.
+
+It generates large programs (by raising max_top_level and max_depth in
+GenConfig) and translates them with the dispatch table of ASTVisitor, and
+with a visit that binds every visitor method on each call (the behaviour
+before the table). Both must produce the same text.
+
+Usage (from the codeGenerator directory):
+    python3 -m benchmarks.translators [--size 20:3] [--seeds N] [--repeat N]
+"""
+import argparse
+import signal
+import sys
+import timeit
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="20:3",
+                        help="max_top_level:max_depth of the programs")
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=int, default=20,
+                        help="seconds per generated program")
+    args = parser.parse_args()
+    # The generator parses the command line (src.args) when it is imported.
+    del sys.argv[1:]
+    return args
+
+
+ARGS = _parse_args()
+
+from src import utils  # noqa: E402
+from src.generators import Generator  # noqa: E402
+from src.generators.config import cfg  # noqa: E402
+from src.ir.visitors import ASTVisitor  # noqa: E402
+from src.translators.java import JavaTranslator  # noqa: E402
+from src.translators.kotlin import KotlinTranslator  # noqa: E402
+
+TRANSLATORS = {'kotlin': KotlinTranslator, 'java': JavaTranslator}
+
+
+class Timeout(Exception):
+    pass
+
+
+def _timeout(*_):
+    raise Timeout()
+
+
+def visit_with_bound_methods(self, node):
+    """ASTVisitor.visit as it was: a dict of bound methods on every call."""
+    visitors = {
+        node_cls: getattr(self, name)
+        for node_cls, name in ASTVisitor.VISITORS.items()
+    }
+    visitor = visitors.get(node.__class__)
+    if visitor is None:
+        raise Exception("Cannot find visitor for instance node " +
+                        str(node.__class__))
+    return visitor(node)
+
+
+def generate_programs(language, seeds, timeout):
+    programs = []
+    for seed in range(1, seeds + 1):
+        utils.randomUtil.reset_word_pool()
+        utils.randomUtil.reset_random(seed)
+        signal.alarm(timeout)
+        try:
+            programs.append(Generator(language=language).generate())
+        except Exception:
+            # Either a timeout or a failure of the generator for this seed.
+            pass
+        finally:
+            signal.alarm(0)
+    return programs
+
+
+def translate(language, programs):
+    return [
+        utils.translate_program(TRANSLATORS[language]('src.bench', {}),
+                                program) for program in programs
+    ]
+
+
+def main(args):
+    signal.signal(signal.SIGALRM, _timeout)
+    top_level, depth = map(int, args.size.split(":"))
+    limits = cfg.limits.max_top_level, cfg.limits.max_depth
+    cfg.limits.max_top_level, cfg.limits.max_depth = top_level, depth
+    try:
+        programs = {
+            language: generate_programs(language, args.seeds, args.timeout)
+            for language in TRANSLATORS
+        }
+    finally:
+        cfg.limits.max_top_level, cfg.limits.max_depth = limits
+
+    print("size: {}".format(args.size))
+    print("{:<10}{:>10}{:>10}{:>16}{:>12}{:>10}".format(
+        "language", "programs", "lines", "bound (ms)", "table (ms)",
+        "speed-up"))
+    visit = ASTVisitor.visit
+    for language, progs in programs.items():
+        texts = translate(language, progs)
+        ASTVisitor.visit = visit_with_bound_methods
+        try:
+            assert translate(language, progs) == texts
+            old = min(timeit.repeat(lambda: translate(language, progs),
+                                    number=1, repeat=args.repeat))
+        finally:
+            ASTVisitor.visit = visit
+        new = min(timeit.repeat(lambda: translate(language, progs),
+                                number=1, repeat=args.repeat))
+        lines = sum(text.count("\n") for text in texts)
+        print("{:<10}{:>10}{:>10}{:>16.2f}{:>12.2f}{:>10}".format(
+            language, len(progs), lines, old * 1e3, new * 1e3,
+            "{:.1f}x".format(old / new)))
+
+
+if __name__ == "__main__":
+    main(ARGS)
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for the identifier word pool of RandomUtils.
+
+It compares the cost of drawing an identifier and of resetting the pool
+between the WordPool and the previous OrderedSet based implementation
+(a tuple copy of the pool on every draw, plus an O(n) removal).
+
+Usage (from the codeGenerator directory):
+    python3 -m benchmarks.word_pool [--words N] [--draws N] [--repeat N]
+"""
+import argparse
+import os
+import random as rnd
+import timeit
+
+from ordered_set import OrderedSet
+
+from src.utils import WordPool, RandomUtils, read_lines
+
+
+class OrderedSetPool():
+    """The word pool as it was implemented before WordPool."""
+
+    def __init__(self, words):
+        self.initial_words = OrderedSet(words)
+        self.words = OrderedSet(self.initial_words)
+
+    def word(self, r):
+        word = r.choice(tuple(self.words))
+        self.words.remove(word)
+        return word
+
+    def reset(self):
+        self.words = OrderedSet(self.initial_words)
+
+
+class WordPoolAdapter():
+
+    def __init__(self, words):
+        self.words = WordPool(words)
+
+    def word(self, r):
+        return self.words.pop(r.choice(range(len(self.words))))
+
+    def reset(self):
+        self.words.reset()
+
+
+def _bench(pool_cls, words, draws, repeat):
+    pool = pool_cls(words)
+    r = rnd.Random(0)
+
+    def draw():
+        pool.reset()
+        for _ in range(draws):
+            pool.word(r)
+
+    per_draw = min(timeit.repeat(draw, number=1, repeat=repeat))
+    per_reset = min(timeit.repeat(pool.reset, number=100,
+                                  repeat=repeat)) / 100
+    return (per_draw - per_reset) / draws, per_reset
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=RandomUtils.WORD_POOL_LEN)
+    parser.add_argument("--draws", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    all_words = read_lines(os.path.join(RandomUtils.resource_path, "words"))
+    words = rnd.Random(0).sample(all_words, args.words)
+
+    # Both pools must produce the same sequence of words for the same seed.
+    old, new = OrderedSetPool(words), WordPoolAdapter(words)
+    r1, r2 = rnd.Random(1), rnd.Random(1)
+    assert [old.word(r1) for _ in range(args.draws)] == \
+        [new.word(r2) for _ in range(args.draws)]
+
+    print("pool size: {}, draws per run: {}".format(args.words, args.draws))
+    print("{:<12}{:>16}{:>16}".format("pool", "per word (us)",
+                                      "per reset (us)"))
+    for name, pool_cls in (("OrderedSet", OrderedSetPool),
+                           ("WordPool", WordPoolAdapter)):
+        per_word, per_reset = _bench(pool_cls, words, args.draws, args.repeat)
+        print("{:<12}{:>16.2f}{:>16.2f}".format(name, per_word * 1e6,
+                                                 per_reset * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ import grpc
 from src import utils
 from src.args import args as cli_args
 from src.generators import Generator
-from src.modules.logging import Logger
+from src.modules.logging import DEBUG, Logger
 from src.server import server_pb2_grpc, GeneratorImpl
 from src.translators.java import JavaTranslator
 from src.translators.kotlin import KotlinTranslator
@@ -38,7 +38,7 @@ def gen_program(pid, packages):
     translator = TRANSLATORS[cli_args.language]('src.' + packages[0],
                                                 cli_args.options['Translator'])
     if cli_args.log:
-        logger = Logger("Generator")
+        logger = Logger("Generator", level=DEBUG)
     else:
         logger = None
     generator = Generator(language=cli_args.language, logger=logger)
@@ -84,18 +84,39 @@ def main():
 
 
 async def serve():
-    server = grpc.aio.server()
-    server_pb2_grpc.add_GeneratorServicer_to_server(GeneratorImpl(), server)
+    # The workers must be forked before the gRPC server is created.
+    generator = GeneratorImpl(workers=cli_args.workers,
+                              cache_size=cli_args.cache_size * 2**20,
+                              profile=cli_args.profile,
+                              profile_slow_ms=cli_args.profile_slow_ms,
+                              profile_dir=os.path.join(
+                                  cli_args.test_directory, "profiles"),
+                              generation_timeout=cli_args.generation_timeout,
+                              timeouts_path=os.path.join(
+                                  cli_args.test_directory, "timeouts.jsonl"),
+                              log_level=cli_args.generation_log_level)
+    compression = {
+        'none': grpc.Compression.NoCompression,
+        'gzip': grpc.Compression.Gzip,
+        'deflate': grpc.Compression.Deflate,
+    }[cli_args.compression]
+    server = grpc.aio.server(compression=compression)
+    server_pb2_grpc.add_GeneratorServicer_to_server(generator, server)
     listen_addr = '[::]:50051'
     server.add_insecure_port(listen_addr)
     logger.log("Starting server on {}".format(listen_addr))
-    await server.start()
-    await server.wait_for_termination()
+    try:
+        await server.start()
+        await server.wait_for_termination()
+    finally:
+        generator.shutdown()
 
 logger = Logger("Hephaestus")
 
 if __name__ == "__main__":
     logger.log("Run Hephaestus")
+    if cli_args.trace_random:
+        utils.randomUtil.enable_tracing()
     if cli_args.debug:
         logger.log("Debug mode on")
         main()
@@ -10,6 +10,56 @@ parser.add_argument(
     "--log",
     action="store_true",
     help="Keep logs for each transformation (bugs/session/logs)")
+parser.add_argument(
+    "--trace-random",
+    action="store_true",
+    help="Log the caller, the arguments and the result of every random draw "
+    "(slow, use it only for debugging)")
+
+parser.add_argument(
+    "-w",
+    "--workers",
+    type=int,
+    default=0,
+    help="Number of worker processes generating programs for the server "
+    "(default: 0, generate on the event loop)")
+parser.add_argument(
+    "--cache-size",
+    type=int,
+    default=0,
+    help="Size in MB of the on-disk cache of the programs served by the "
+    "server, e.g. 256 to replay seeds without generating them again; 0 "
+    "disables it (default: 0)")
+parser.add_argument(
+    "--compression",
+    choices=("none", "gzip", "deflate"),
+    default="none",
+    help="Compression of the responses of the server (default: none)")
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="Log the time of the phases and the counts of the expensive "
+    "operations of every generated program, and send them in the responses")
+parser.add_argument(
+    "--profile-slow-ms",
+    type=int,
+    default=0,
+    help="Dump the cProfile stats of the programs whose generation takes at "
+    "least this many ms into logs/profiles, 0 disables it (default: 0)")
+parser.add_argument(
+    "--generation-timeout",
+    type=int,
+    default=120,
+    help="Abort the generation of a program after this many seconds, even "
+    "if its request has a later deadline, 0 disables it (default: 120). The "
+    "seeds that time out are recorded in logs/timeouts.jsonl")
+parser.add_argument(
+    "--generation-log-level",
+    choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+    default="INFO",
+    help="Level of the logs of the generation of the programs, which the "
+    "requests can override; DEBUG logs every decision of the generator "
+    "(slow, default: INFO)")
 
 args = parser.parse_args()
 args.test_directory = os.path.join(cwd, "logs")
@@ -20,6 +20,8 @@ TODOs:
 """
 # pylint: disable=too-many-instance-attributes,too-many-arguments,dangerous-default-value
 import functools
+import operator
+import time
 from collections import defaultdict
 from copy import deepcopy
 from typing import Tuple, List, Callable
@@ -34,16 +36,31 @@ from src.ir import BUILTIN_FACTORIES
 from src.ir import ast, types as tp, type_utils as tu
 from src.ir.builtins import BuiltinFactory
 from src.ir.context import Context
-from src.modules.logging import Logger, log
+from src.modules.logging import DEBUG, Logger, log
+from src.modules import profiling
+
+
+class GenerationTimeout(Exception):
+    """The generation of a program has exceeded its deadline."""
 
 
 # noinspection PyUnresolvedReferences,PyTypeChecker,PyArgumentList
 class Generator:
 
-    def __init__(self, language=None, options=None, logger=None):
+    def __init__(self,
+                 language=None,
+                 options=None,
+                 logger=None,
+                 deadline=None):
         assert language is not None, "You must specify the language"
         self.language = language
         self.logger: Logger = logger
+        # The time (time.time()) after which the generation is aborted with
+        # GenerationTimeout, None for no deadline. It is checked at the
+        # boundaries of the declarations and the expressions.
+        self.deadline = deadline
+        # The types built by generate() are interned into this table.
+        self.type_table = tp.TypeTable()
         # noinspection PyTypeChecker
         self.context: typing.Optional[Context] = None
         self.bt_factory: BuiltinFactory = BUILTIN_FACTORIES[language]
@@ -66,6 +83,44 @@ class Generator:
         self.ret_builtin_types = self.bt_factory.get_non_nothing_types()
         self.builtin_types = self.ret_builtin_types + \
                              [self.bt_factory.get_void_type()]
+        # The available types of get_types: the builtin and the function
+        # types per (ret_types, exclude_arrays, exclude_function_types), the
+        # types of the classes (see _get_class_type), and the last tuple of
+        # available types handed out per flags, with the class types it was
+        # built from.
+        self._builtin_type_lists = {}
+        self._class_types = {}
+        self._available_types = {}
+
+        # The candidate generators of get_generators, which are called as
+        # gen(expr_type, only_leaves, subtype).
+        self._constant_generators = self._get_constant_generators()
+        # gen_new with sam_coercion disabled and enabled.
+        self._new_generators = {
+            False:
+            self.gen_new,
+            True:
+            lambda x, only_leaves, subtype: self.gen_new(
+                x, only_leaves, subtype, sam_coercion=True),
+        }
+        self._boolean_op_generators = (
+            lambda x, only_leaves, subtype: self.gen_logical_expr(
+                x, only_leaves),
+            lambda x, only_leaves, subtype: self.gen_equality_expr(only_leaves
+                                                                   ),
+            lambda x, only_leaves, subtype: self.gen_comparison_expr(
+                only_leaves),
+        )
+        self._other_generators = (self.gen_field_access, self.gen_conditional,
+                                  self.gen_is_expr, self.gen_func_call,
+                                  self.gen_variable)
+        self._void_generators = (
+            self.gen_func_call,
+            lambda x, only_leaves, subtype: self.gen_assignment(
+                x, only_leaves),
+        )
+        # Builtin type -> the generators of its binary operations.
+        self._bt_operation_generators = {}
 
         # In some case we need to use two namespaces. One for having access
         # to variables from scope, and one for adding new declarations.
@@ -86,6 +141,12 @@ class Generator:
         self.loopExpr = 0
         self.allow_bottom_consts = True
 
+    def _check_deadline(self):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise GenerationTimeout(
+                "The generation has exceeded its deadline by {:.0f}ms".format(
+                    (time.time() - self.deadline) * 1000))
+
     ### Entry Point Generators ###
 
     def generate(self, context=None) -> ast.Program:
@@ -94,11 +155,24 @@ class Generator:
         It first generates a number `n` top-level declarations,
         and then it generates the main function.
         """
-        self.context = context or Context()
-        for _ in ut.randomUtil.range(cfg.limits.min_top_level,
-                                     cfg.limits.max_top_level):
-            self.gen_top_level_declaration()
-        self.generate_main_func()
+        with profiling.phase("context_setup"):
+            self.context = context or Context()
+            tp.use_type_table(self.type_table)
+            tp.use_subtype_cache(self.context.subtype_cache)
+        try:
+            for _ in ut.randomUtil.range(cfg.limits.min_top_level,
+                                         cfg.limits.max_top_level):
+                with profiling.phase("gen_top_level_declaration"):
+                    self.gen_top_level_declaration()
+            with profiling.phase("generate_main_func"):
+                self.generate_main_func()
+        finally:
+            # The table and the cache are only valid for this program.
+            tp.use_type_table(None)
+            tp.use_subtype_cache(None)
+        cache = self.context.subtype_cache
+        log(self.logger, "Subtype cache: {} hits, {} misses ({:.1%} hit rate)",
+            cache.hits, cache.misses, cache.hit_rate())
         return ast.Program(self.context, self.language)
 
     def gen_class_for_bottom_constant(self, super_class: ast.ClassDeclaration,
@@ -157,6 +231,7 @@ class Generator:
             self.gen_class_decl,
             self.gen_func_decl,
         ]
+        self._check_deadline()
         gen_func = ut.randomUtil.choice(candidates)
         gen_func()
 
@@ -382,6 +457,7 @@ class Generator:
         Returns:
             A function declaration node.
         """
+        self._check_deadline()
         func_name = func_name or gu.gen_identifier('lower')
 
         initial_namespace = self.namespace
@@ -534,6 +610,7 @@ class Generator:
         Returns:
             A class declaration node.
         """
+        self._check_deadline()
         class_name = class_name or gu.gen_identifier('capitalize')
         initial_namespace = self.namespace
         self.namespace += (class_name, )
@@ -1022,6 +1099,7 @@ class Generator:
         Returns:
             The generated expression.
         """
+        self._check_deadline()
         if self.depth >= cfg.limits.max_depth and self.allow_bottom_consts:
             if tu.is_builtin(expr_type, self.bt_factory):
                 gen_bottom = False
@@ -1047,8 +1125,11 @@ class Generator:
                                         concrete_only=True)
             old_type = expr_type
             expr_type = ut.randomUtil.choice(subtypes)
-            msg = "Found subtype of {}: {}".format(old_type, expr_type)
-            log(self.logger, msg)
+            log(self.logger,
+                "Found subtype of {}: {}",
+                old_type,
+                expr_type,
+                level=DEBUG)
         generators = self.get_generators(expr_type,
                                          only_leaves,
                                          subtype,
@@ -1058,7 +1139,8 @@ class Generator:
         if existing_expr and ut.randomUtil.bool(0.7):
             expr = existing_expr
         else:
-            expr = ut.randomUtil.choice(generators)(expr_type)
+            expr = ut.randomUtil.choice(generators)(expr_type, only_leaves,
+                                                    subtype)
         # Make a probablistic choice, and assign the generated expr
         # into a variable, and return that variable reference.
         gen_var = (not only_leaves
@@ -1084,22 +1166,20 @@ class Generator:
         """
         if expr_type is None:
             return None
-        _vars = self.context.get_vars(self.namespace, glob=False)
+        _vars = self.context.get_vars_by_type(self.namespace,
+                                              declared=True).get(
+                                                  expr_type, [])
         matched_vars = []
-        for key, var in _vars.items():
-            if isinstance(
-                    var,
-                    ast.FieldDeclaration) and var.field_type == expr_type and (
-                        not var.is_final or allow_final):
+        for var in _vars:
+            if isinstance(var, ast.FieldDeclaration) and (not var.is_final
+                                                          or allow_final):
                 if self._inside_java_lambda and not allow_final:
                     continue
                 matched_vars.append(ast.Variable(var.name))
-            if isinstance(var, ast.ParameterDeclaration
-                          ) and var.param_type == expr_type and allow_final:
+            if isinstance(var, ast.ParameterDeclaration) and allow_final:
                 matched_vars.append(ast.Variable(var.name))
-            if isinstance(var, ast.VariableDeclaration
-                          ) and var.var_type == expr_type and (not var.is_final
-                                                               or allow_final):
+            if isinstance(var, ast.VariableDeclaration) and (not var.is_final
+                                                             or allow_final):
                 if self._inside_java_lambda and not allow_final:
                     if len(
                             self.context.get_namespaces_decls(
@@ -1115,25 +1195,31 @@ class Generator:
         """
         Get generators for builtins
         :param etype: builtin type
-        :return: list of lambda expressions that return a binary operation on built-in types
+        :return: tuple of lambda expressions that return a binary operation on built-in types
         """
         if not hasattr(etype, 'get_binary_ops'):
-            return []
+            return ()
         var_in_context = self.find_existing_variable(etype)
         if var_in_context is None:
-            return []
+            return ()
+        # The builtin types are interned, their keys are unique.
+        generators = self._bt_operation_generators.get(etype.intern_key())
+        if generators is not None:
+            return generators
         generators = []
         for op in etype.get_binary_ops():
             if (len(op)) == 3:
                 op = op + (False, )
             op_class, operation, ret_type, cast = op
             if ret_type == etype:
-                binary_op_generator = lambda x, et=etype, op_cl=op_class, oper=operation, rt=ret_type: op_cl(
+                binary_op_generator = lambda x, *_, et=etype, op_cl=op_class, oper=operation, rt=ret_type: op_cl(
                     self.generate_expr(et), self.generate_expr(et), oper
                 ) if not cast else ast.ClassCast(
                     op_cl(self.generate_expr(et), self.generate_expr(et), oper
                           ), rt)
                 generators.append(binary_op_generator)
+        generators = tuple(generators)
+        self._bt_operation_generators[etype.intern_key()] = generators
         return generators
 
     def gen_loop_body_from_existing(self) -> ast.Block:
@@ -1143,7 +1229,8 @@ class Generator:
         Body contains only func calls.
         :return: ast.Block - new loop body
         """
-        _vars = self.context.get_vars(self.namespace, glob=False)
+        # The views of the context are shared; extend a copy.
+        _vars = dict(self.context.get_vars(self.namespace, glob=False))
         new_vars = []
         for _ in ut.randomUtil.range(0, cfg.limits.max_var_decls):
             name = gu.gen_identifier('lower')
@@ -1153,7 +1240,7 @@ class Generator:
             ])
             generator = self.get_generators(etype, True, True, False)[0]
             var = ast.VariableDeclaration(name,
-                                          generator(etype),
+                                          generator(etype, True, True),
                                           is_final=ut.randomUtil.bool(),
                                           var_type=etype)
             _vars[name] = var
@@ -1247,6 +1334,8 @@ class Generator:
             var_decl = self.gen_variable_decl(etype, only_leaves)
             var_decl.is_final = False
             var_decl.var_type = var_decl.get_type()
+            # Index the variable under its new declared type.
+            self.context.add_var(self.namespace, var_decl.name, var_decl)
             self.depth = initial_depth
             return ast.Assignment(
                 var_decl.name,
@@ -1274,29 +1363,36 @@ class Generator:
         effectively final.
         """
         variables = []
-        for var in self.context.get_vars(self.namespace).values():
-            if self._inside_java_lambda:
+        if self._inside_java_lambda:
+            return variables
+        # The non-final fields of each type of final variables, found once
+        # per type.
+        fields = {}
+        for etype, decls in self.context.get_vars_by_type(
+                self.namespace).items():
+            if all(not getattr(var, 'is_final', True) for var in decls):
+                continue
+            var_type = self._get_var_type_to_search(etype)
+            if not var_type or isinstance(
+                    getattr(var_type, 't_constructor', None),
+                    self.function_type):
+                fields[etype] = []
                 continue
+            cls, type_var_map = self._get_class(var_type)
+            # Ok here we create a new field whose type corresponds
+            # to the type argument with which the class 'c' is
+            # instantiated.
+            fields[etype] = [(field.name,
+                              tp.substitute_type(field.get_type(),
+                                                 type_var_map))
+                             for field in cls.fields if not field.is_final]
+        for var in self.context.get_vars(self.namespace).values():
             if not getattr(var, 'is_final', True):
                 variables.append((None, var))
                 continue
-            var_type = self._get_var_type_to_search(var.get_type())
-            if not var_type:
-                continue
-            if isinstance(getattr(var_type, 't_constructor', None),
-                          self.function_type):
-                continue
-            cls, type_var_map = self._get_class(var_type)
-            for field in cls.fields:
-                # Ok here we create a new field whose type corresponds
-                # to the type argument with which the class 'c' is
-                # instantiated.
-                field_sub = ast.FieldDeclaration(field.name,
-                                                 field_type=tp.substitute_type(
-                                                     field.get_type(),
-                                                     type_var_map))
-                if not field.is_final:
-                    variables.append((ast.Variable(var.name), field_sub))
+            for name, field_type in fields[var.get_type()]:
+                field_sub = ast.FieldDeclaration(name, field_type=field_type)
+                variables.append((ast.Variable(var.name), field_sub))
         return variables
 
     # And
@@ -1829,17 +1925,20 @@ class Generator:
             only_leaves: do not generate new leaves except from `expr`.
             subtype: The returned type could be a subtype of `etype`.
         """
-        log(self.logger, "Generating function call of type {}".format(etype))
+        log(self.logger,
+            "Generating function call of type {}",
+            etype,
+            level=DEBUG)
         funcs = self._get_matching_function_declarations(etype, subtype)
         if not funcs:
             msg = "No compatible functions in the current scope for type {}"
-            log(self.logger, msg.format(etype))
+            log(self.logger, msg, etype, level=DEBUG)
             type_fun = self._get_matching_class(etype,
                                                 subtype=subtype,
                                                 attr_name='functions')
             if type_fun is None:
                 msg = "No compatible classes for type {}"
-                log(self.logger, msg.format(etype))
+                log(self.logger, msg, etype, level=DEBUG)
                 # Here, we generate a function or a class containing a function
                 # whose return type is 'etype'.
                 type_fun = self._gen_matching_func(etype, not_void=True)
@@ -1858,8 +1957,14 @@ class Generator:
         params_map.update(func_type_map or {})
 
         msg = ("Selected callee method {}: type {}; receiver {}; "
-               "TypeVarMap {}".format(func.name, etype, receiver, params_map))
-        log(self.logger, msg)
+               "TypeVarMap {}")
+        log(self.logger,
+            msg,
+            func.name,
+            etype,
+            receiver,
+            params_map,
+            level=DEBUG)
         args = []
         initial_depth = self.depth
         self.depth += 1
@@ -2131,9 +2236,9 @@ class Generator:
                                         exclude_var=False,
                                         sam_coercion=False)
         if t == self.bt_factory.get_any_type() and len(const_gen) == 1:
-            return const_gen[0](t)
+            return const_gen[0](t, True, False)
         if len(const_gen) == 1:
-            return const_gen[0](t)
+            return const_gen[0](t, True, False)
 
     # Where
 
@@ -2255,9 +2360,13 @@ class Generator:
                        only_leaves: bool,
                        subtype: bool,
                        exclude_var: bool,
-                       sam_coercion=False) -> List[Callable]:
+                       sam_coercion=False) -> Tuple[Callable, ...]:
         """Get candidate generators for the given type.
 
+        The generators are built once per Generator; a generator is called
+        as gen(expr_type, only_leaves, subtype) with the same only_leaves
+        and subtype.
+
         Args:
             expr_type: targeted type.
             only_leaves: do not generate new leaves except from `expr`.
@@ -2269,84 +2378,20 @@ class Generator:
             sam_coercion: Enable sam coercion.
 
         Returns:
-            A list of generator functions
+            A tuple of generator functions
         """
-
-        def gen_variable(etype):
-            return self.gen_variable(etype, only_leaves, subtype)
-
-        def gen_fun_call(etype):
-            return self.gen_func_call(etype,
-                                      only_leaves=only_leaves,
-                                      subtype=subtype)
-
-        # Do not generate new nodes in context.
-        leaf_canidates = [
-            lambda x: self.gen_new(
-                x, only_leaves, subtype, sam_coercion=sam_coercion),
-        ]
-        constant_candidates = {
-            self.bt_factory.get_number_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.
-                                                 get_number_type())),
-            self.bt_factory.get_integer_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.
-                                                 get_integer_type())),
-            self.bt_factory.get_big_integer_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.
-                                                 get_big_integer_type())),
-            self.bt_factory.get_byte_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.get_byte_type(
-            ))),
-            self.bt_factory.get_short_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.
-                                                 get_short_type())),
-            self.bt_factory.get_long_type().name:
-            (lambda x: gens.gen_integer_constant(self.bt_factory.get_long_type(
-            ))),
-            self.bt_factory.get_float_type().name:
-            (lambda x: gens.gen_real_constant(self.bt_factory.get_float_type())
-             ),
-            self.bt_factory.get_double_type().name:
-            gens.gen_real_constant,
-            self.bt_factory.get_big_decimal_type().name:
-            gens.gen_real_constant,
-            self.bt_factory.get_char_type().name:
-            gens.gen_char_constant,
-            self.bt_factory.get_string_type().name:
-            gens.gen_string_constant,
-            self.bt_factory.get_boolean_type().name:
-            gens.gen_bool_constant,
-            self.bt_factory.get_array_type().name:
-            (lambda x: self.gen_array_expr(x, only_leaves, subtype=subtype)),
-        }
-        binary_ops = {
-            self.bt_factory.get_boolean_type(): [
-                lambda x: self.gen_logical_expr(x, only_leaves),
-                lambda x: self.gen_equality_expr(only_leaves),
-                lambda x: self.gen_comparison_expr(only_leaves)
-            ],
-        }
-        other_candidates = [
-            lambda x: self.gen_field_access(x, only_leaves, subtype), lambda x:
-            self.gen_conditional(x, only_leaves=only_leaves, subtype=subtype),
-            lambda x: self.gen_is_expr(
-                x, only_leaves=only_leaves, subtype=subtype), gen_fun_call,
-            gen_variable
-        ]
-
         if expr_type == self.bt_factory.get_void_type():
             # The assignment operator in Java evaluates to the assigned value.
             # if self.language == 'java':
             #    return [gen_fun_call]
-            return [
-                gen_fun_call, lambda x: self.gen_assignment(x, only_leaves)
-            ]
+            return self._void_generators
 
+        # Do not generate new nodes in context.
+        gen_new = self._new_generators[sam_coercion]
+        con_candidate = self._constant_generators.get(expr_type.name)
         if self.depth >= cfg.limits.max_depth or only_leaves:
-            gen_con = constant_candidates.get(expr_type.name)
-            if gen_con is not None:
-                return [gen_con]
+            if con_candidate is not None:
+                return (con_candidate, )
             gen_var = (self._vars_in_context.get(self.namespace,
                                                  0) < cfg.limits.max_var_decls
                        and not only_leaves and not exclude_var)
@@ -2355,17 +2400,61 @@ class Generator:
                 # If the maximum numbers of variables in a specific context
                 # has been reached, or we have previously declared a variable
                 # of a specific type, then we should avoid variable creation.
-                leaf_canidates.append(gen_variable)
-            return leaf_canidates
-        con_candidate = constant_candidates.get(expr_type.name)
+                return (gen_new, self.gen_variable)
+            return (gen_new, )
         binary_ops_canidates = self.get_bt_operation_generators(expr_type)
         if con_candidate is not None:
-            candidates = [con_candidate] + binary_ops.get(expr_type, [])
+            candidates = (con_candidate, )
+            if expr_type == self.bt_factory.get_boolean_type():
+                candidates += self._boolean_op_generators
             if not exclude_var:
-                candidates.append(gen_variable)
+                candidates += (self.gen_variable, )
         else:
-            candidates = leaf_canidates
-        return other_candidates + candidates + binary_ops_canidates
+            candidates = (gen_new, )
+        return self._other_generators + candidates + binary_ops_canidates
+
+    def _get_constant_generators(self):
+        """Map the names of the builtin types to the generators of their
+        constants (see get_generators).
+        """
+
+        def integer_constant(etype):
+            return lambda x, only_leaves, subtype: gens.gen_integer_constant(
+                etype)
+
+        def constant(gen_constant):
+            return lambda x, only_leaves, subtype: gen_constant(x)
+
+        factory = self.bt_factory
+        return {
+            factory.get_number_type().name:
+            integer_constant(factory.get_number_type()),
+            factory.get_integer_type().name:
+            integer_constant(factory.get_integer_type()),
+            factory.get_big_integer_type().name:
+            integer_constant(factory.get_big_integer_type()),
+            factory.get_byte_type().name:
+            integer_constant(factory.get_byte_type()),
+            factory.get_short_type().name:
+            integer_constant(factory.get_short_type()),
+            factory.get_long_type().name:
+            integer_constant(factory.get_long_type()),
+            factory.get_float_type().name:
+            (lambda x, only_leaves, subtype: gens.gen_real_constant(
+                factory.get_float_type())),
+            factory.get_double_type().name:
+            constant(gens.gen_real_constant),
+            factory.get_big_decimal_type().name:
+            constant(gens.gen_real_constant),
+            factory.get_char_type().name:
+            constant(gens.gen_char_constant),
+            factory.get_string_type().name:
+            constant(gens.gen_string_constant),
+            factory.get_boolean_type().name:
+            constant(gens.gen_bool_constant),
+            factory.get_array_type().name:
+            self.gen_array_expr,
+        }
 
     def get_types(self,
                   ret_types=True,
@@ -2373,12 +2462,15 @@ class Generator:
                   exclude_covariants=False,
                   exclude_contravariants=False,
                   exclude_type_vars=False,
-                  exclude_function_types=False) -> List[tp.Type]:
+                  exclude_function_types=False) -> Tuple[tp.Type, ...]:
         """Get all available types.
 
         Including user-defined types, built-ins, and function types.
         Note that this may include Type Constructors.
 
+        The result is a tuple that is shared between the calls, as long as
+        the classes in scope do not change, so it must not be modified.
+
         Args:
             ret_types: use non-nothing built-in types (use this option if you
                 want to generate a return type).
@@ -2389,14 +2481,8 @@ class Generator:
             exclude_function_types: exclude function types.
 
         Returns:
-            A list of available types.
+            A tuple of available types.
         """
-        usr_types = [
-            c.get_type()
-            for c in self.context.get_classes(self.namespace).values()
-        ]
-        if self.depth >= cfg.limits.max_depth:
-            usr_types = []
         type_params = []
         if not exclude_type_vars:
             for t_param in self.context.get_types(self.namespace).values():
@@ -2408,18 +2494,53 @@ class Generator:
                 type_params.append(t_param)
 
         if type_params and ut.randomUtil.bool():
-            return type_params
-
-        builtins = list(
-            self.ret_builtin_types if ret_types else self.builtin_types)
-        if exclude_arrays:
-            builtins = [
-                t for t in builtins
-                if t.name != self.bt_factory.get_array_type().name
-            ]
-        if exclude_function_types:
-            return usr_types + builtins
-        return usr_types + builtins + self.function_types
+            return tuple(type_params)
+
+        usr_types = ()
+        if self.depth < cfg.limits.max_depth:
+            usr_types = tuple(
+                map(self._get_class_type,
+                    self.context.get_classes(self.namespace).values()))
+        key = (ret_types, exclude_arrays, exclude_function_types)
+        available = self._available_types.get(key)
+        if available is not None and len(
+                available[0]) == len(usr_types) and all(
+                    map(operator.is_, available[0], usr_types)):
+            return available[1]
+        types = usr_types + self._get_builtin_type_list(*key)
+        self._available_types[key] = (usr_types, types)
+        return types
+
+    def _get_builtin_type_list(self, ret_types, exclude_arrays,
+                               exclude_function_types):
+        """The builtin and the function types of get_types."""
+        key = (ret_types, exclude_arrays, exclude_function_types)
+        types = self._builtin_type_lists.get(key)
+        if types is None:
+            builtins = list(
+                self.ret_builtin_types if ret_types else self.builtin_types)
+            if exclude_arrays:
+                builtins = [
+                    t for t in builtins
+                    if t.name != self.bt_factory.get_array_type().name
+                ]
+            if not exclude_function_types:
+                builtins += self.function_types
+            types = self._builtin_type_lists[key] = tuple(builtins)
+        return types
+
+    def _get_class_type(self, cls: ast.ClassDeclaration) -> tp.Type:
+        """The type of cls, which is built again only if its supertypes or
+        its type parameters have been replaced (e.g. the supertypes of a
+        class are set after it is added to the context).
+        """
+        entry = self._class_types.get(id(cls))
+        if (entry is None or entry[1] is not cls.supertypes
+                or entry[2] is not cls.type_parameters):
+            # Keep the class alive, so that its id is not reused.
+            entry = (cls, cls.supertypes, cls.type_parameters, cls.get_type())
+            self._class_types[id(cls)] = entry
+        return entry[3]
 
     def select_type(self,
                     ret_types=True,
@@ -2461,8 +2582,10 @@ class Generator:
                 enable_pecs=self.enable_pecs,
                 disable_variance_functions=self.disable_variance_functions,
                 variance_choices={})
-            msg = "Instantiating type constructor {}".format(stype)
-            log(self.logger, msg)
+            log(self.logger,
+                "Instantiating type constructor {}",
+                stype,
+                level=DEBUG)
         return stype
 
     def gen_type_params(self,
@@ -2615,20 +2738,19 @@ class Generator:
         refs = []
 
         # Get variables without receivers
-        variables = list(self.context.get_vars(self.namespace).values())
+        variables = self.context.get_vars_by_type(self.namespace).get(
+            etype, [])
         if self._inside_java_lambda:
-            variables = list(
-                filter(
-                    lambda v: (getattr(v, 'is_final', False) or
-                               (v not in self.context.get_vars(
-                                   self.namespace[:-1]).values())), variables))
-        variables += list(
-            self.context.get_vars(('global', ), only_current=True).values())
+            outer = self.context.get_vars_by_type(self.namespace[:-1]).get(
+                etype, [])
+            variables = [
+                v for v in variables
+                if getattr(v, 'is_final', False) or v not in outer
+            ]
+        variables = variables + self.context.get_vars_by_type(
+            ('global', )).get(etype, [])
         for var_decl in variables:
-            var_type = var_decl.get_type()
-            var = ast.Variable(var_decl.name)
-            if var_type == etype:
-                refs.append(var)
+            refs.append(ast.Variable(var_decl.name))
 
         # field accesses
         objs = self._get_matching_objects(etype,
@@ -2755,10 +2877,9 @@ class Generator:
                 #  Get all variable declarations in loop context (i.e., variables defined in a parent loop)
                 decls_in_loop_context = {
                     decl.name: decl
-                    for decl, namespace in self.context._namespaces.items()
+                    for decl in self.context.get_child_declarations(
+                        self.namespace, only_loops=True)
                     if isinstance(decl, ast.VariableDeclaration)
-                    and namespace[:-1] == self.namespace
-                    and namespace[-1].__contains__('loop')
                 }
 
                 # Get all variable declarations in loop context that are not already in decls_in_body or decls_in_loop
@@ -3001,7 +3122,7 @@ class Generator:
         # in the current class.
         msg = ("Searching for function declarations that match type {};"
                " checking signature {}")
-        log(self.logger, msg.format(etype, signature))
+        log(self.logger, msg, etype, signature, level=DEBUG)
         for func in self.context.get_funcs(self.namespace).values():
             # The receiver object for this kind of functions is None.
             if func.get_type() == self.bt_factory.get_void_type():
@@ -3086,9 +3207,13 @@ class Generator:
                     self.get_types(),
                     only_regular=True,
                     type_var_map={})
-            msg = "Generating a method {} of type {}; TypeVarMap {}".format(
-                func.name, etype, func_type_var_map)
-            log(self.logger, msg)
+            msg = "Generating a method {} of type {}; TypeVarMap {}"
+            log(self.logger,
+                msg,
+                func.name,
+                etype,
+                func_type_var_map,
+                level=DEBUG)
             return gu.AttrAccessInfo(None, {}, func, func_type_var_map)
         # Generate a class containing the requested function
         return self._gen_matching_class(etype,
@@ -3119,7 +3244,7 @@ class Generator:
             declaration (field or function).
         """
         msg = "Searching for class that contains {} of type {}"
-        log(self.logger, msg.format(attr_name, etype))
+        log(self.logger, msg, attr_name, etype, level=DEBUG)
         class_decls = self._get_matching_class_decls(etype,
                                                      subtype=subtype,
                                                      attr_name=attr_name,
@@ -3146,7 +3271,12 @@ class Generator:
                 disable_variance=variance_choices is None)
             msg = ("Found parameterized class {} with TypeVarMap {} and "
                    "incomplete TypeVarMap {}")
-            log(self.logger, msg.format(cls.name, params_map, type_var_map))
+            log(self.logger,
+                msg,
+                cls.name,
+                params_map,
+                type_var_map,
+                level=DEBUG)
             if is_parameterized_func:
                 # Here we have found a parameterized function in a
                 # parameterized class. So wee need to both instantiate
@@ -3186,11 +3316,16 @@ class Generator:
                     type_var_map=type_var_map)
             cls_type, params_map = cls.get_type(), {}
 
-        attr_msg = "Attribute {}; type: {}, TypeVarMap{}".format(
-            attr_name, etype, func_type_var_map)
-        msg = "Selected class {} with TypeVarMap {};" " matches {}".format(
-            cls.name, params_map, attr_msg)
-        log(self.logger, msg)
+        msg = ("Selected class {} with TypeVarMap {}; matches Attribute {}; "
+               "type: {}, TypeVarMap{}")
+        log(self.logger,
+            msg,
+            cls.name,
+            params_map,
+            attr_name,
+            etype,
+            func_type_var_map,
+            level=DEBUG)
         return gu.AttrAccessInfo(cls_type, params_map, attr, func_type_var_map)
 
     def _is_sigtype_compatible(
@@ -3319,6 +3454,7 @@ class Generator:
             An AttrAccessInfo for the generated class type and attribute
             declaration (field or function).
         """
+        self._check_deadline()
         initial_namespace = self.namespace
         class_name = gu.gen_identifier('capitalize')
         type_params = None
@@ -3389,10 +3525,14 @@ class Generator:
 
             msg = ("Generated a class {} with an attribute {} of type {}; "
                    "ClassTypeVarMap {}, FuncTypeVarMap {}")
-            log(
-                self.logger,
-                msg.format(cls.name, attr_name, etype, params_map,
-                           func_type_var_map))
+            log(self.logger,
+                msg,
+                cls.name,
+                attr_name,
+                etype,
+                params_map,
+                func_type_var_map,
+                level=DEBUG)
             return gu.AttrAccessInfo(cls_type, params_map, attr,
                                      func_type_var_map)
         return None
@@ -3412,8 +3552,10 @@ class Generator:
 
         if isinstance(etype, tp.TypeParameter):
             type_params = self.gen_type_params(count=1)
+            # The type parameters of gen_type_params are invariant (no
+            # with_variance), and their variance must not change: the types
+            # built with them have already hashed it.
             type_params[0].bound = etype.get_bound_rec(self.bt_factory)
-            type_params[0].variance = tp.Invariant
             return type_params, {etype: type_params[0]}, True
 
         # the given type is parameterized
@@ -3444,6 +3586,5 @@ class Generator:
                     filter(lambda t: t is not None, bounds), bounds[0])
             else:
                 type_param.bound = None
-            type_param.variance = tp.Invariant
             type_var_map[type_var] = type_param
         return type_params, type_var_map, can_wildcard
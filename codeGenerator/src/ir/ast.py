@@ -1,5 +1,6 @@
 # pylint: disable=dangerous-default-value
-from copy import deepcopy
+import operator
+from copy import copy, deepcopy
 from typing import List, Union
 
 from ordered_set import OrderedSet
@@ -19,6 +20,11 @@ def check_list_eq(first, second):
     return all(s.is_equal(o) for o, s in zip(first, second))
 
 
+def _same_items(first, second):
+    """Check that two sequences contain the same objects."""
+    return len(first) == len(second) and all(map(operator.is_, first, second))
+
+
 def check_default_eq(first, second):
     if first is not None:
         return first.is_equal(second)
@@ -71,9 +77,8 @@ class Program(Node):
             new_types.append(t)
         return new_types
 
-    # noinspection PyProtectedMember
     def update_declarations(self, decls):
-        self.context._context[GLOBAL_NAMESPACE]['decls'] = decls
+        self.context.replace_declarations(GLOBAL_NAMESPACE, decls)
 
     def _add_function(self, namespace, func):
         self.context.add_func(namespace, func.name, func)
@@ -567,6 +572,8 @@ class ClassDeclaration(Declaration):
         self.is_final = is_final
         self.type_parameters = type_parameters if type_parameters else []
         self.supertypes = [s.class_type for s in self.superclasses]
+        # The attributes inherited by the class (see _get_view).
+        self._views = {}
 
     @property
     def attributes(self):
@@ -641,39 +648,64 @@ class ClassDeclaration(Declaration):
     def get_overridable_fields(self):
         return [f for f in self.fields if f.can_override]
 
+    def _get_view(self, kind, class_decls):
+        """Return the view `kind` of the attributes of the class.
+
+        A view is a tuple computed by the method `kind`, from the declaration
+        of the superclass found in class_decls and its own view `kind`. The
+        inherited attributes are shallow copies of those of the superclass,
+        whose types are substituted; they share everything else with them
+        (e.g., the bodies of the functions).
+
+        A view is computed once, and reused until the fields, the functions
+        or the superclasses of the class, or the view of the superclass
+        change. So, the views must not be modified.
+        """
+        class_decl, parent_view, super_type = None, None, None
+        if self.superclasses:
+            super_cls = self.superclasses[0]
+            super_type = super_cls.class_type
+            class_decl = tu.get_superclass_decl(super_cls, class_decls)
+            if class_decl is not None:
+                parent_view = class_decl._get_view(kind, class_decls)
+        deps = (self.fields, self.functions, self.superclasses,
+                (class_decl, parent_view, super_type))
+        cached = self._views.get(kind)
+        if cached is not None and all(map(_same_items, cached[0], deps)):
+            return cached[1]
+        view = getattr(self, kind)(class_decl, parent_view)
+        self._views[kind] = (tuple(map(tuple, deps)), view)
+        return view
+
     def get_callable_functions(self,
                                class_decls) -> OrderedSet[FunctionDeclaration]:
         """All functions that can be called in instantiations of this class
         """
-        # Get functions that are implemented in the current class
-        functions = OrderedSet(self.functions)
+        return OrderedSet(self._get_view('_callable_functions', class_decls))
 
-        if not self.superclasses:
-            return functions
+    def _callable_functions(self, class_decl, parent_funcs):
+        # Get functions that are implemented in the current class
+        functions = list(self.functions)
 
         # Retrieve functions from the inheritance chain.
-        super_cls = self.superclasses[0]
-        class_decl = tu.get_superclass_decl(super_cls, class_decls)
-
         if not class_decl:
-            return functions
-
-        type_var_map = tu.get_superclass_type_var_map(super_cls, class_decl)
+            return tuple(functions)
 
-        parent_funcs = class_decl.get_callable_functions(class_decls)
+        type_var_map = tu.get_superclass_type_var_map(self.superclasses[0],
+                                                      class_decl)
 
         # substitute type variables in parent's functions
         for f in parent_funcs:
-            new_f = deepcopy(f)
+            new_f = copy(f)
             params = []
             for p in f.params:
-                new_p = deepcopy(p)
+                new_p = copy(p)
                 new_p.param_type = types.substitute_type(
                     p.get_type(), type_var_map)
                 params.append(new_p)
             type_params = []
             for t_param in f.type_parameters:
-                new_tparam = deepcopy(t_param)
+                new_tparam = copy(t_param)
                 if new_tparam.bound:
                     new_tparam.bound = types.substitute_type(
                         t_param.bound, type_var_map)
@@ -683,43 +715,39 @@ class ClassDeclaration(Declaration):
             new_f.params = params
             new_f.inferred_type = ret_type
             new_f.ret_type = ret_type
-            functions.add(new_f)
+            functions.append(new_f)
 
-        return functions
+        return tuple(functions)
 
     def get_all_fields(self, class_decls) -> OrderedSet[FieldDeclaration]:
         """
         All fields (including the inheritted ones) that can be accessed by
         instantiations of this class.
         """
-        fields = OrderedSet(self.fields)
-        field_names = {f.name for f in fields}
+        return OrderedSet(self._get_view('_all_fields', class_decls))
 
-        if not self.superclasses:
-            return fields
+    def _all_fields(self, class_decl, parent_fields):
+        fields = list(self.fields)
+        field_names = {f.name for f in fields}
 
         # Retrieve fields from the inheritance chain.
-        super_cls = self.superclasses[0]
-        class_decl = tu.get_superclass_decl(super_cls, class_decls)
-
         if not class_decl:
-            return fields
+            return tuple(fields)
 
-        type_var_map = tu.get_superclass_type_var_map(super_cls, class_decl)
-
-        parent_fields = class_decl.get_all_fields(class_decls)
+        type_var_map = tu.get_superclass_type_var_map(self.superclasses[0],
+                                                      class_decl)
 
         # substitute type variables in parent's functions
         for f in parent_fields:
             if f.name in field_names:
                 # We override this field in the current class
                 continue
-            new_f = deepcopy(f)
+            new_f = copy(f)
             new_f.field_type = types.substitute_type(f.get_type(),
                                                      type_var_map)
-            fields.add(new_f)
+            fields.append(new_f)
 
-        return fields
+        return tuple(fields)
 
     def get_all_attributes(
         self, class_decls
@@ -733,29 +761,27 @@ class ClassDeclaration(Declaration):
         return attributes
 
     def get_abstract_functions(self, class_decls) -> List[FunctionDeclaration]:
+        return list(self._get_view('_abstract_functions', class_decls))
+
+    def _abstract_functions(self, class_decl, parent_funcs):
         # Get the abstract functions that are declared in the current class.
         functions = [f for f in self.functions if f.body is None]
-        if not self.superclasses:
-            return functions
 
         # Retrieve any abstract function from the inheritance chain.
-        super_cls = self.superclasses[0]
-        class_decl = tu.get_superclass_decl(super_cls, class_decls)
-
         if not class_decl:
-            return functions
+            return tuple(functions)
 
-        type_var_map = tu.get_superclass_type_var_map(super_cls, class_decl)
+        type_var_map = tu.get_superclass_type_var_map(self.superclasses[0],
+                                                      class_decl)
 
-        funcs = class_decl.get_abstract_functions(class_decls)
         implemented_funcs = {
             f.name
             for f in self.functions if f.body is not None
         }
-        for f in funcs:
+        for f in parent_funcs:
             if f.name in implemented_funcs:
                 continue
-            new_f = deepcopy(f)
+            new_f = copy(f)
             params = []
             for p in f.params:
                 new_p = deepcopy(p)
@@ -780,7 +806,7 @@ class ClassDeclaration(Declaration):
             new_f.ret_type = ret_type
             new_f.type_parameters = type_params
             functions.append(new_f)
-        return functions
+        return tuple(functions)
 
     def inherits_from(self, cls):
         """
@@ -5,6 +5,14 @@ from src.ir.types import Builtin, TypeConstructor, TypeParameter
 
 
 class BuiltinFactory(ABC):
+    """
+    The types of a language.
+
+    Builtin types are immutable: the getters of a factory return the same
+    instance on every call, so the types can be compared by identity.
+    """
+    _non_nothing_types = None
+    _number_types = None
 
     @abstractmethod
     def get_language(self):
@@ -87,25 +95,26 @@ class BuiltinFactory(ABC):
         pass
 
     def get_non_nothing_types(self):
-        return [
-            self.get_any_type(),
-            self.get_number_type(),
-            self.get_integer_type(),
-            self.get_byte_type(),
-            self.get_short_type(),
-            self.get_long_type(),
-            self.get_float_type(),
-            self.get_double_type(),
-            self.get_big_decimal_type(),
-            self.get_big_integer_type(),
-            self.get_boolean_type(),
-            self.get_char_type(),
-            self.get_string_type(),
-            self.get_array_type()
-        ]
+        if self._non_nothing_types is None:
+            self._non_nothing_types = self._get_non_nothing_types()
+        return list(self._non_nothing_types)
+
+    def _get_non_nothing_types(self):
+        return (self.get_any_type(), self.get_number_type(),
+                self.get_integer_type(), self.get_byte_type(),
+                self.get_short_type(), self.get_long_type(),
+                self.get_float_type(), self.get_double_type(),
+                self.get_big_decimal_type(), self.get_big_integer_type(),
+                self.get_boolean_type(), self.get_char_type(),
+                self.get_string_type(), self.get_array_type())
 
     def get_number_types(self):
-        return [
+        if self._number_types is None:
+            self._number_types = self._get_number_types()
+        return list(self._number_types)
+
+    def _get_number_types(self):
+        return (
             self.get_byte_type(),
             self.get_short_type(),
             self.get_integer_type(),
@@ -114,7 +123,7 @@ class BuiltinFactory(ABC):
             self.get_double_type(),
             self.get_big_decimal_type(),
             self.get_big_integer_type(),
-        ]
+        )
 
     def get_function_types(self, max_parameters):
         return [
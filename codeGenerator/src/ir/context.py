@@ -1,9 +1,10 @@
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 
 from ordered_set import OrderedSet
 
 from src import utils
 from src.ir import ast
+from src.ir import types as tp
 
 
 class Context():
@@ -12,8 +13,32 @@ class Context():
         self._context = {}
         # A lookup from declarations to namespaces
         self._namespaces = {}
+        # The reverse of _namespaces: the child namespaces of each namespace,
+        # tagged with whether they are loop scopes, and the declarations of
+        # each namespace, along with their position in _namespaces.
+        self._children = defaultdict(dict)
+        self._namespace_decls = defaultdict(dict)
+        self._next_position = 0
+        # Subtyping queries on the types of this program.
+        self.subtype_cache = tp.SubtypeCache()
+        # Every change of the declarations of a namespace bumps the version
+        # of (namespace, entity), and the global version of the entity.
+        self._versions = {}
+        self._glob_versions = defaultdict(int)
+        # Merged views returned by _get_declarations, along with the versions
+        # they were computed from. The views are never updated in place, so
+        # callers can hold them as snapshots.
+        self._views = {}
+        # The views of the variables, indexed by type (see get_vars_by_type).
+        self._type_indexes = {}
+
+    def _touch(self, namespace, entity):
+        key = (namespace, entity)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._glob_versions[entity] += 1
 
     def _add_entity(self, namespace, entity, name, value):
+        self._touch(namespace, entity)
         if namespace in self._context:
             self._context[namespace][entity][name] = value
         else:
@@ -26,15 +51,24 @@ class Context():
                 'decls': OrderedDict()  # Here we keep the declaration order
             }
             self._context[namespace][entity][name] = value
+        old_namespace = self._namespaces.get(value)
+        if old_namespace is None:
+            position = self._next_position
+            self._next_position += 1
+        else:
+            position = self._namespace_decls[old_namespace].pop(value)
         self._namespaces[value] = namespace
+        self._namespace_decls[namespace][value] = position
+        self._children[namespace[:-1]][namespace] = 'loop' in namespace[-1]
 
     def _remove_entity(self, namespace, entity, name):
         if namespace not in self._context:
             return
         if name in self._context[namespace][entity]:
+            self._touch(namespace, entity)
             decl = self._context[namespace][entity][name]
             if decl in self._namespaces:
-                del self._namespaces[decl]
+                del self._namespace_decls[self._namespaces.pop(decl)][decl]
             del self._context[namespace][entity][name]
 
     def add_type(self, namespace, type_name, t):
@@ -52,6 +86,7 @@ class Context():
         self._add_entity(namespace, 'decls', var_name, var)
 
     def add_class(self, namespace, class_name, cls):
+        self.subtype_cache.invalidate(class_name)
         self._add_entity(namespace, 'classes', class_name, cls)
         self._add_entity(namespace, 'decls', class_name, cls)
 
@@ -70,6 +105,7 @@ class Context():
         self._remove_entity(namespace, 'lambdas', shadow_name)
 
     def remove_class(self, namespace, class_name):
+        self.subtype_cache.invalidate(class_name)
         self._remove_entity(namespace, 'classes', class_name)
         self._remove_entity(namespace, 'decls', class_name)
 
@@ -88,6 +124,34 @@ class Context():
                           none):
         len_namespace = len(namespace)
         assert len_namespace >= 1
+        if glob:
+            # The view spans the whole tree of namespaces, which is built
+            # from functions and classes.
+            key = ((namespace[0], ), decl_type, none, 'glob')
+            version = (self._glob_versions[decl_type],
+                       self._glob_versions['funcs'],
+                       self._glob_versions['classes'])
+        elif len_namespace == 1 or only_current:
+            if none:
+                return self._context.get(namespace, {}).get(decl_type, {})
+            key = (namespace, decl_type, none, 'current')
+            version = self._versions.get((namespace, decl_type), 0)
+        else:
+            key = (namespace, decl_type, none, 'chain')
+            version = tuple(
+                self._versions.get((namespace[:i], decl_type), 0)
+                for i in range(1, len_namespace + 1))
+        view = self._views.get(key)
+        if view is not None and view[0] == version:
+            return view[1]
+        decls = self._compute_declarations(namespace, decl_type, only_current,
+                                           glob, none)
+        self._views[key] = (version, decls)
+        return decls
+
+    def _compute_declarations(self, namespace, decl_type, only_current, glob,
+                              none):
+        len_namespace = len(namespace)
         decls = {}
         if glob:
             decls = self._get_declarations_glob(namespace, decl_type)
@@ -166,6 +230,33 @@ class Context():
         return self._get_declarations(namespace, 'vars', only_current, glob,
                                       none)
 
+    def get_vars_by_type(self, namespace, declared=False):
+        """Index the variables that are visible in the given namespace (i.e.,
+        get_vars(namespace)) by their type.
+
+        If declared is True, variable declarations are indexed by their
+        declared type (var_type) instead of their inferred type.
+
+        Returns a dict from types to the lists of declarations of that type,
+        in the order of get_vars. Finality is not part of the index: the
+        generator may change it after a variable is declared.
+        """
+        view = self.get_vars(namespace)
+        key = (namespace, declared)
+        index = self._type_indexes.get(key)
+        # The view is rebuilt whenever the variables change.
+        if index is None or index[0] is not view:
+            by_type = {}
+            for decl in view.values():
+                if declared and isinstance(decl, ast.VariableDeclaration):
+                    etype = decl.var_type
+                else:
+                    etype = decl.get_type()
+                by_type.setdefault(etype, []).append(decl)
+            index = (view, by_type)
+            self._type_indexes[key] = index
+        return index[1]
+
     def get_classes(self,
                     namespace,
                     only_current=False,
@@ -184,7 +275,29 @@ class Context():
 
     def remove_namespace(self, namespace):
         if namespace in self._context:
-            self._context.pop(namespace)
+            for entity in self._context.pop(namespace):
+                self._touch(namespace, entity)
+
+    def replace_declarations(self, namespace, decls):
+        """Replace the (ordered) declarations of the given namespace."""
+        self._touch(namespace, 'decls')
+        self._context[namespace]['decls'] = decls
+
+    def get_child_declarations(self, namespace, only_loops=False):
+        """Get the declarations of the namespaces directly nested in the
+        given namespace, in the order they were added to the context.
+
+        If only_loops is True, only the declarations of loop scopes are
+        returned.
+        """
+        decls = [
+            (position, decl)
+            for child, is_loop in self._children.get(namespace, {}).items()
+            if is_loop or not only_loops
+            for decl, position in self._namespace_decls[child].items()
+        ]
+        decls.sort(key=lambda d: d[0])
+        return [decl for _, decl in decls]
 
     def get_declarations_in(self, namespace):
         decls = {}
@@ -10,6 +10,24 @@ from src.ir.types import Builtin
 
 class JavaBuiltinFactory(bt.BuiltinFactory):
 
+    def __init__(self):
+        self._void_type = VoidType()
+        self._object_type = ObjectType()
+        self._number_type = NumberType()
+        self._integer_type = IntegerType(primitive=False)
+        self._byte_type = ByteType(primitive=False)
+        self._short_type = ShortType(primitive=False)
+        self._long_type = LongType(primitive=False)
+        self._float_type = FloatType(primitive=False)
+        self._double_type = DoubleType(primitive=False)
+        self._boolean_type = BooleanType(primitive=False)
+        self._char_type = CharType(primitive=False)
+        self._string_type = StringType()
+        self._array_type = ArrayType()
+        self._array_list_type = ArrayListType()
+        self._iterator_type = IteratorType()
+        self._function_types = {}
+
     def get_language(self):
         return "java"
 
@@ -17,58 +35,62 @@ class JavaBuiltinFactory(bt.BuiltinFactory):
         return JavaBuiltin
 
     def get_void_type(self):
-        return VoidType()
+        return self._void_type
 
     def get_any_type(self):
-        return ObjectType()
+        return self._object_type
 
     def get_number_type(self):
-        return NumberType()
+        return self._number_type
 
     def get_integer_type(self):
-        return IntegerType(primitive=False)
+        return self._integer_type
 
     def get_byte_type(self):
-        return ByteType(primitive=False)
+        return self._byte_type
 
     def get_short_type(self):
-        return ShortType(primitive=False)
+        return self._short_type
 
     def get_long_type(self):
-        return LongType(primitive=False)
+        return self._long_type
 
     def get_float_type(self):
-        return FloatType(primitive=False)
+        return self._float_type
 
     def get_double_type(self):
-        return DoubleType(primitive=False)
+        return self._double_type
 
     def get_big_decimal_type(self):
-        return DoubleType(primitive=False)
+        return self._double_type
 
     def get_boolean_type(self):
-        return BooleanType(primitive=False)
+        return self._boolean_type
 
     def get_char_type(self):
-        return CharType(primitive=False)
+        return self._char_type
 
     def get_string_type(self):
-        return StringType()
+        return self._string_type
 
     def get_array_type(self):
-        return ArrayType()
+        return self._array_type
 
     def get_array_list_type(self):
-        return ArrayListType()
+        return self._array_list_type
 
     def get_iterator_type(self):
-        return IteratorType()
+        return self._iterator_type
 
     def get_big_integer_type(self):
-        return IntegerType(primitive=False)
+        return self._integer_type
 
     def get_function_type(self, nr_parameters=0):
-        return FunctionType(nr_parameters)
+        function_type = self._function_types.get(nr_parameters)
+        if function_type is None:
+            function_type = FunctionType(nr_parameters)
+            self._function_types[nr_parameters] = function_type
+        return function_type
 
     def get_non_nothing_types(self):
         return super().get_non_nothing_types()
@@ -83,6 +105,9 @@ class JavaBuiltin(Builtin):
         super().__init__(name)
         self.primitive = primitive
 
+    def intern_key(self):
+        return self.__class__, self.name, self.primitive
+
     def __str__(self):
         if not self.is_primitive():
             return str(self.name) + "(java-builtin)"
@@ -6,6 +6,25 @@ import src.ir.types as tp
 
 class KotlinBuiltinFactory(bt.BuiltinFactory):
 
+    def __init__(self):
+        self._unit_type = UnitType()
+        self._any_type = AnyType()
+        self._number_type = NumberType()
+        self._integer_type = IntegerType()
+        self._byte_type = ByteType()
+        self._short_type = ShortType()
+        self._long_type = LongType()
+        self._float_type = FloatType()
+        self._double_type = DoubleType()
+        self._boolean_type = BooleanType()
+        self._char_type = CharType()
+        self._string_type = StringType()
+        self._array_type = ArrayType()
+        self._array_list_type = ArrayListType()
+        self._iterator_type = IteratorType()
+        self._nothing_type = NothingType()
+        self._function_types = {}
+
     def get_language(self):
         return "kotlin"
 
@@ -13,62 +32,66 @@ class KotlinBuiltinFactory(bt.BuiltinFactory):
         return KotlinBuiltin
 
     def get_void_type(self):
-        return UnitType()
+        return self._unit_type
 
     def get_any_type(self):
-        return AnyType()
+        return self._any_type
 
     def get_number_type(self):
-        return NumberType()
+        return self._number_type
 
     def get_integer_type(self):
-        return IntegerType()
+        return self._integer_type
 
     def get_byte_type(self):
-        return ByteType()
+        return self._byte_type
 
     def get_short_type(self):
-        return ShortType()
+        return self._short_type
 
     def get_long_type(self):
-        return LongType()
+        return self._long_type
 
     def get_float_type(self):
-        return FloatType()
+        return self._float_type
 
     def get_double_type(self):
-        return DoubleType()
+        return self._double_type
 
     def get_big_decimal_type(self):
-        return DoubleType()
+        return self._double_type
 
     def get_big_integer_type(self):
         # FIXME
-        return IntegerType()
+        return self._integer_type
 
     def get_boolean_type(self):
-        return BooleanType()
+        return self._boolean_type
 
     def get_char_type(self):
-        return CharType()
+        return self._char_type
 
     def get_string_type(self):
-        return StringType()
+        return self._string_type
 
     def get_array_type(self):
-        return ArrayType()
+        return self._array_type
 
     def get_array_list_type(self):
-        return ArrayListType()
+        return self._array_list_type
 
     def get_iterator_type(self):
-        return IteratorType()
+        return self._iterator_type
 
     def get_function_type(self, nr_parameters=0):
-        return FunctionType(nr_parameters)
+        function_type = self._function_types.get(nr_parameters)
+        if function_type is None:
+            function_type = FunctionType(nr_parameters)
+            self._function_types[nr_parameters] = function_type
+        return function_type
 
     def get_nothing(self):
-        return NothingType()
+        return self._nothing_type
 
     def get_non_nothing_types(self):
         types = super().get_non_nothing_types()
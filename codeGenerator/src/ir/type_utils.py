@@ -1,3 +1,4 @@
+from copy import copy
 from collections import OrderedDict
 from typing import TypeVar, List, Tuple, Dict
 
@@ -239,17 +240,14 @@ def _find_types(etype,
     # is interpreted a greatest bound.
     if not get_subtypes:
         # Find supertypes
-        t_set = etype.get_supertypes()
+        t_set = set(etype.get_supertypes())
     else:
-        # Find subtypes
-        t_set = OrderedSet()
-        for c in types:
-            selected_type = c.get_type() if hasattr(c, 'get_type') else c
-            if etype == selected_type:
-                continue
-            if selected_type.is_subtype(etype):
-                t_set.add(selected_type)
-                continue
+        # Find subtypes. The search is memoized, what follows it is not,
+        # because it draws random numbers.
+        candidates = [
+            c.get_type() if hasattr(c, 'get_type') else c for c in types
+        ]
+        t_set = OrderedSet(tp.find_subtypes(etype, candidates))
 
     if isinstance(etype, tp.ParameterizedType):
         t_set.add(
@@ -392,18 +390,23 @@ class TypeUpdater():
                           etype,
                           new_type,
                           test_pred=lambda x, y: x.name == y.name):
-        visited = [etype]
-        while visited:
-            source = visited[-1]
-            for i, supert in enumerate(source.supertypes):
-                if supert == new_type:
-                    return
-                source.supertypes[i] = self._update_type(
-                    supert, new_type, test_pred)
-
-                if supert not in visited:
-                    visited.append(supert)
-            visited = visited[1:]
+        """Return etype, or a copy of it with updated supertypes.
+
+        Types may be interned and shared (see TypeTable), so their supertypes
+        are never updated in place.
+        """
+        supertypes = []
+        for supert in etype.supertypes:
+            if supert == new_type:
+                return etype
+            supertypes.append(self._update_type(supert, new_type, test_pred))
+        if all(new is old for new, old in zip(supertypes, etype.supertypes)):
+            return etype
+        etype = copy(etype)
+        etype.supertypes = supertypes
+        if hasattr(etype, '_hash'):
+            etype._hash = None
+        return etype
 
     def _update_type(self,
                      etype,
@@ -437,7 +440,7 @@ class TypeUpdater():
         if isinstance(etype, tp.Builtin) or isinstance(new_type, tp.Builtin):
             return etype
 
-        self.update_supertypes(etype, new_type, test_pred)
+        etype = self.update_supertypes(etype, new_type, test_pred)
         is_wildcard = isinstance(etype, tp.WildCardType)
         # Case 1: The test_pred func of the two types match.
         if test_pred(etype, new_type) and not is_wildcard:
@@ -459,13 +462,17 @@ class TypeUpdater():
             return new_t_constructor.new(new_type_args)
         # Case 3: If etype is a type constructor recursively inspect is type
         # parameters for updates.
+        # Type constructors (and their type parameters) are shared, so they
+        # are copied before being updated.
         if etype.is_type_constructor():
             t_params = []
             for t_param in etype.type_parameters:
                 if t_param.bound is not None:
+                    t_param = copy(t_param)
                     t_param.bound = self._update_type(t_param.bound, new_type,
                                                       test_pred)
                 t_params.append(t_param)
+            etype = copy(etype)
             etype.type_parameters = t_params
             return etype
 
@@ -1220,14 +1227,16 @@ def is_sam(context, etype=None, cls_decl=None):
 
 def find_sam_fun_signature(context, etype, get_function_type, type_var_map={}):
 
+    # The signature may be an interned type shared with other holders, so
+    # the replaced type arguments go into new types.
     def replace_targ(targ, type_var_map):
         if isinstance(targ, (tp.TypeParameter, tp.WildCardType)):
             return type_var_map.get(targ, targ)
         if isinstance(targ, tp.ParameterizedType):
-            targ.type_args = [
-                replace_targ(t, type_var_map) for t in targ.type_args
-            ]
-            return targ
+            return tp.ParameterizedType(
+                targ.t_constructor,
+                [replace_targ(t, type_var_map)
+                 for t in targ.type_args], targ.can_infer_type_args)
         return targ
 
     if not is_sam(context, etype=etype):
@@ -1238,9 +1247,7 @@ def find_sam_fun_signature(context, etype, get_function_type, type_var_map={}):
         sig = cls_decl.functions[0].get_signature(
             get_function_type(nr_func_params))
         if isinstance(sig, tp.ParameterizedType):
-            sig.type_args = [
-                replace_targ(targ, type_var_map) for targ in sig.type_args
-            ]
+            sig = replace_targ(sig, type_var_map)
         return sig
     if cls_decl.supertypes:
         return find_sam_fun_signature(context, cls_decl.supertypes[0],
@@ -1250,13 +1257,14 @@ def find_sam_fun_signature(context, etype, get_function_type, type_var_map={}):
 
 def get_superclass_decl(super_cls, class_decls):
     class_decl = None
+    super_type = super_cls.class_type
+    if isinstance(super_type, tp.ParameterizedType):
+        super_type = super_type.t_constructor
     for c in class_decls:
-        if isinstance(super_cls.class_type, tp.ParameterizedType):
-            if super_cls.class_type.t_constructor == c.get_type():
-                class_decl = c
-        else:
-            if super_cls.class_type == c.get_type():
-                class_decl = c
+        # Only a class of the same name can have the same type; skip the
+        # others without building their type.
+        if c.name == super_type.name and super_type == c.get_type():
+            class_decl = c
     return class_decl
 
 
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from copy import deepcopy, copy
+from copy import copy
 from typing import List, Dict
 
 from ordered_set import OrderedSet
@@ -51,6 +51,242 @@ Contravariant = Variance(Variance.CONTRAVARIANT)
 
 
 # noinspection PyAbstractClass
+class TypeTable():
+    """
+    Hash-consing table of types.
+
+    While a table is in use (see `use_type_table`), every SimpleClassifier
+    and ParameterizedType is interned when it is built: building a type that
+    is structurally equal to a type of the table returns the type of the
+    table. So, equal types are (mostly) the same object, and they are
+    compared by identity and hashed once. A table is meant to be scoped to a
+    single Generator run.
+
+    Builtin types are immutable, so they are interned once for all the
+    tables (see `BuiltinType`).
+
+    Type parameters and wildcards are not interned, because their bounds are
+    updated in place by the generator. The types that contain them are
+    interned by the identity of these components. Their variance is part of
+    their hash, so it is fixed once they are built.
+    """
+
+    def __init__(self):
+        self._types = {}
+
+    def __len__(self):
+        return len(self._types)
+
+    def intern(self, t: Type) -> Type:
+        return self._types.setdefault(t.intern_key(), t)
+
+
+_type_table: TypeTable = None
+
+
+def use_type_table(table: TypeTable):
+    """Intern the types built from now on into the given table (or stop
+    interning them if table is None).
+    """
+    global _type_table
+    _type_table = table
+
+
+class InternedType(type):
+    """Metaclass of the types that are interned into the active TypeTable."""
+
+    def __call__(cls, *args, **kwargs):
+        t = super().__call__(*args, **kwargs)
+        if _type_table is None:
+            return t
+        return _type_table.intern(t)
+
+
+_builtin_types = {}
+# (class, arguments) -> the builtin type built by the call.
+_builtin_calls = {}
+
+
+class BuiltinType(InternedType):
+    """Metaclass of the builtin types, which are interned whether a TypeTable
+    is in use or not: there is a single instance of every builtin type.
+
+    A builtin type depends only on the arguments of its constructor, so a
+    call with the same arguments returns the instance without building it.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        key = (cls, args, tuple(kwargs.items()))
+        t = _builtin_calls.get(key)
+        if t is None:
+            t = type.__call__(cls, *args, **kwargs)
+            t = _builtin_types.setdefault(t.intern_key(), t)
+            _builtin_calls[key] = t
+        return t
+
+
+class SubtypeCache():
+    """
+    Memo of the subtyping relation and of the supertype closures.
+
+    Only builtins and classifiers without type variables are cached: the
+    relation between them depends only on their structure, whereas the
+    bounds of type variables are updated in place by the generator. Entries
+    are keyed by the identity of the types (see TypeTable), and indexed by
+    the names of the types they involve, so that they can be dropped when a
+    class is added to or removed from the context (see `invalidate`).
+
+    It also memoizes the subtypes of a type among a list of available types
+    (see `find_subtypes`), keyed by the identity of the type and of the
+    available types, until a class is added or removed.
+
+    While a cache is in use (see `use_subtype_cache`), `get_supertypes` and
+    `type_utils.find_subtypes` go through it.
+    """
+
+    def __init__(self):
+        self._subtypes = {}
+        self._supertypes = {}
+        self._names = defaultdict(list)
+        self._searches = {}
+        self._search_matches = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _is_cacheable(t):
+        return (isinstance(t, (Builtin, SimpleClassifier))
+                and not t.has_type_variables())
+
+    def is_subtype(self, t1: Type, t2: Type) -> bool:
+        if not (self._is_cacheable(t1) and self._is_cacheable(t2)):
+            return t1.is_subtype(t2)
+        key = (id(t1), id(t2))
+        entry = self._subtypes.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        res = t1.is_subtype(t2)
+        # Keep the types alive, so that their ids are not reused.
+        self._subtypes[key] = (res, t1, t2)
+        self._names[t1.name].append((self._subtypes, key))
+        self._names[t2.name].append((self._subtypes, key))
+        return res
+
+    def get_supertypes(self, t: Type):
+        if not self._is_cacheable(t):
+            return t.compute_supertypes()
+        entry = self._supertypes.get(id(t))
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        supertypes = t.compute_supertypes()
+        self._supertypes[id(t)] = (supertypes, t)
+        for name in {st.name for st in supertypes}:
+            self._names[name].append((self._supertypes, id(t)))
+        return supertypes
+
+    @staticmethod
+    def _is_searchable(t):
+        # As for is_subtype, the types must not depend on type variables or
+        # wildcards, whose bounds may change. The type variables of a type
+        # constructor are those of its class.
+        return not (t.is_type_var() or t.is_wildcard() or
+                    (t.is_parameterized() and
+                     (t.has_type_variables() or t.has_wildcards())))
+
+    @staticmethod
+    def _search_key(t):
+        # The type constructors of the classes are built anew by every
+        # get_type(), so they are keyed by their components.
+        if t.is_type_constructor():
+            return (t.__class__, t.name, tuple(map(id, t.type_parameters)),
+                    tuple(map(id, t.supertypes)))
+        return id(t)
+
+    def find_subtypes(self, etype: Type, types: List[Type]):
+        """The types of types, but etype, that are subtypes of etype.
+
+        The result (a tuple) is reused for the same etype and types until a
+        class is added or removed. Otherwise, the subtyping of etype and
+        every type is memoized, as long as they do not depend on type
+        variables.
+        """
+        t_keys = tuple(map(self._search_key, types))
+        key = (id(etype), t_keys)
+        entry = self._searches.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        if etype.has_type_variables() or not self._is_searchable(etype):
+            return tuple(t for t in types
+                         if etype != t and self.is_subtype(t, etype))
+        searchable = True
+        subtypes = []
+        for t, t_key in zip(types, t_keys):
+            match_key = (key[0], t_key)
+            match = self._search_matches.get(match_key)
+            if match is not None:
+                self.hits += 1
+                is_match = match[0]
+            elif self._is_searchable(t):
+                self.misses += 1
+                is_match = etype != t and self.is_subtype(t, etype)
+                self._search_matches[match_key] = (is_match, etype, t)
+                self._names[etype.name].append(
+                    (self._search_matches, match_key))
+                self._names[t.name].append((self._search_matches, match_key))
+            else:
+                searchable = False
+                is_match = etype != t and self.is_subtype(t, etype)
+            if is_match:
+                subtypes.append(t)
+        subtypes = tuple(subtypes)
+        if searchable:
+            # Keep the types alive, so that their ids are not reused.
+            self._searches[key] = (subtypes, etype, types)
+        return subtypes
+
+    def invalidate(self, name):
+        """Drop the entries that involve a type with the given name."""
+        for table, key in self._names.pop(name, ()):
+            table.pop(key, None)
+        # A search involves all the classes available.
+        self._searches.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_subtype_cache: SubtypeCache = None
+
+
+def use_subtype_cache(cache: SubtypeCache):
+    """Answer subtyping queries through the given cache (or compute them
+    every time if cache is None).
+    """
+    global _subtype_cache
+    _subtype_cache = cache
+
+
+def is_subtype(t1: Type, t2: Type) -> bool:
+    """Check whether t1 is subtype of t2, through the cache in use if any."""
+    if _subtype_cache is None:
+        return t1.is_subtype(t2)
+    return _subtype_cache.is_subtype(t1, t2)
+
+
+def find_subtypes(etype: Type, types: List[Type]):
+    """The types of types, but etype, that are subtypes of etype, through the
+    cache in use if any."""
+    if _subtype_cache is None:
+        return [t for t in types if etype != t and t.is_subtype(etype)]
+    return _subtype_cache.find_subtypes(etype, types)
+
+
 class Type(Node):
 
     def __init__(self, name):
@@ -99,7 +335,15 @@ class Type(Node):
         return False
 
     def get_supertypes(self):
-        """Return self and the transitive closure of the supertypes"""
+        """Return self and the transitive closure of the supertypes.
+
+        The returned set must not be modified, it may be cached.
+        """
+        if _subtype_cache is not None:
+            return _subtype_cache.get_supertypes(self)
+        return self.compute_supertypes()
+
+    def compute_supertypes(self):
         stack = [self]
         visited = {self}
         while stack:
@@ -137,7 +381,7 @@ class AbstractType(Type):
 
 
 # noinspection PyAbstractClass
-class Builtin(Type):
+class Builtin(Type, metaclass=BuiltinType):
     """https://kotlinlang.org/spec/type-system.html#built-in-types
     """
 
@@ -145,6 +389,13 @@ class Builtin(Type):
         super().__init__(name)
         self.supertypes = [self]
 
+    def intern_key(self):
+        return self.__class__, self.name
+
+    def __deepcopy__(self, memo):
+        # Builtin types are immutable.
+        return self
+
     def has_type_variables(self):
         return False
 
@@ -157,7 +408,7 @@ class Builtin(Type):
 
     def __hash__(self):
         """Hash based on the Type"""
-        return hash(str(self.__class__))
+        return hash(self.__class__)
 
     def is_subtype(self, other: Type) -> bool:
         return other == self or other in self.get_supertypes()
@@ -191,16 +442,20 @@ class Object(Classifier):
 
 
 # noinspection PyAbstractClass
-class SimpleClassifier(Classifier):
+class SimpleClassifier(Classifier, metaclass=InternedType):
     """https://kotlinlang.org/spec/type-system.html#simple-classifier-types
     """
 
     def __init__(self, name: str, supertypes: List[Type] = None, check=False):
         super().__init__(name)
         self.supertypes = supertypes if supertypes is not None else []
+        self._hash = None
         if check:
             self._check_supertypes()
 
+    def intern_key(self):
+        return self.__class__, self.name, tuple(map(id, self.supertypes))
+
     def has_type_variables(self):
         return False
 
@@ -211,13 +466,17 @@ class SimpleClassifier(Classifier):
 
     def __eq__(self, other: Type):
         """Check if two Builtin objects are of the same Type"""
+        if self is other:
+            return True
         return (self.__class__ == other.__class__ and self.name == other.name
                 and self.supertypes == other.supertypes)
 
     def __hash__(self):
         """Hash based on the Type"""
-        return hash("{}{}{}".format(str(self.__class__), str(self.name),
-                                    str(self.supertypes)))
+        if self._hash is None:
+            self._hash = hash(
+                (self.__class__, self.name, tuple(self.supertypes)))
+        return self._hash
 
     def _check_supertypes(self):
         """The transitive closure of supertypes must be consistent, i.e., does
@@ -294,6 +553,8 @@ class TypeParameter(AbstractType):
         return self.bound == other
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (self.__class__ == other.__class__ and self.name == other.name
                 and self.variance == other.variance
                 and self.bound == other.bound)
@@ -458,7 +719,9 @@ def perform_type_substitution(etype,
         t_param = TypeParameter(t_param.name, t_param.variance, new_bound)
         type_params.append(t_param)
 
-    etype = deepcopy(etype)
+    # Type constructors are shared between parameterized types, so
+    # substitution works on a (shallow) copy of the given constructor.
+    etype = copy(etype)
     etype.type_parameters = type_params
     etype.supertypes = supertypes
     return etype
@@ -599,7 +862,11 @@ class ParameterizedType(SimpleClassifier):
                  t_constructor: TypeConstructor,
                  type_args: List[Type],
                  can_infer_type_args=False):
-        self.t_constructor = deepcopy(t_constructor)
+        # Type constructors are treated as immutable values, so the
+        # parameterized type references the given constructor instead of
+        # copying it. Code that needs to update a type constructor must copy
+        # it first (see perform_type_substitution).
+        self.t_constructor = t_constructor
         self.type_args = list(type_args)
         assert len(self.t_constructor.type_parameters) == len(type_args), \
             "You should provide {} types for {}".format(
@@ -610,6 +877,12 @@ class ParameterizedType(SimpleClassifier):
         # XXX revisit
         self.supertypes = copy(self.t_constructor.supertypes)
 
+    def intern_key(self):
+        return (self.__class__, self.t_constructor.__class__, self.name,
+                tuple(map(id, self.t_constructor.type_parameters)),
+                tuple(map(id, self.type_args)),
+                tuple(map(id, self.supertypes)), self._can_infer_type_args)
+
     def is_parameterized(self):
         return True
 
@@ -697,6 +970,8 @@ class ParameterizedType(SimpleClassifier):
         self._can_infer_type_args = value
 
     def __eq__(self, other: Type):
+        if self is other:
+            return True
         if not isinstance(other, ParameterizedType):
             return False
         return (self.name == other.name and self.supertypes == other.supertypes
@@ -707,9 +982,11 @@ class ParameterizedType(SimpleClassifier):
                 and self.type_args == other.type_args)
 
     def __hash__(self):
-        return hash(
-            str(self.name) + str(self.supertypes) + str(self.type_args) +
-            str(self.t_constructor.type_parameters))
+        # The type arguments of a parameterized type are fixed once it is
+        # built, so its hash is computed once.
+        if self._hash is None:
+            self._hash = hash((self.name, tuple(self.type_args)))
+        return self._hash
 
     def __str__(self):
         return "{}<{}>".format(self.name, ", ".join(map(str, self.type_args)))
@@ -4,55 +4,70 @@ from src.ir import types
 
 class ASTVisitor():
 
+    # The method that visits each class of nodes.
+    VISITORS = {
+        ast.SuperClassInstantiation: 'visit_super_instantiation',
+        ast.ClassDeclaration: 'visit_class_decl',
+        types.TypeParameter: 'visit_type_param',
+        ast.CallArgument: 'visit_call_argument',
+        ast.FieldDeclaration: 'visit_field_decl',
+        ast.VariableDeclaration: 'visit_var_decl',
+        ast.ParameterDeclaration: 'visit_param_decl',
+        ast.FunctionDeclaration: 'visit_func_decl',
+        ast.Lambda: 'visit_lambda',
+        ast.FunctionReference: 'visit_func_ref',
+        ast.BottomConstant: 'visit_bottom_constant',
+        ast.IntegerConstant: 'visit_integer_constant',
+        ast.RealConstant: 'visit_real_constant',
+        ast.CharConstant: 'visit_char_constant',
+        ast.StringConstant: 'visit_string_constant',
+        ast.ArrayExpr: 'visit_array_expr',
+        ast.ArrayListExpr: 'visit_array_list_expr',
+        ast.BooleanConstant: 'visit_boolean_constant',
+        ast.Variable: 'visit_variable',
+        ast.LogicalExpr: 'visit_logical_expr',
+        ast.EqualityExpr: 'visit_equality_expr',
+        ast.ComparisonExpr: 'visit_comparison_expr',
+        ast.ArithExpr: 'visit_arith_expr',
+        ast.Conditional: 'visit_conditional',
+        ast.Is: 'visit_is',
+        ast.IncDecExpr: 'visit_inc_dec_expr',
+        ast.New: 'visit_new',
+        ast.FieldAccess: 'visit_field_access',
+        ast.FunctionCall: 'visit_func_call',
+        ast.Assignment: 'visit_assign',
+        ast.Program: 'visit_program',
+        ast.Block: 'visit_block',
+        ast.ForExpr: 'visit_loop',
+        ast.WhileExpr: 'visit_loop',
+        ast.DoWhileExpr: 'visit_loop',
+        ast.ForExpr.RangeExpr: 'visit_loop_expr',
+        ast.ForExpr.IterableExpr: 'visit_loop_expr',
+        ast.ClassCast: 'visit_class_cast',
+    }
+
     def result(self):
         raise NotImplementedError('result() must be implemented')
 
-    def visit(self, node):
-        visitors = {
-            ast.SuperClassInstantiation: self.visit_super_instantiation,
-            ast.ClassDeclaration: self.visit_class_decl,
-            types.TypeParameter: self.visit_type_param,
-            ast.CallArgument: self.visit_call_argument,
-            ast.FieldDeclaration: self.visit_field_decl,
-            ast.VariableDeclaration: self.visit_var_decl,
-            ast.ParameterDeclaration: self.visit_param_decl,
-            ast.FunctionDeclaration: self.visit_func_decl,
-            ast.Lambda: self.visit_lambda,
-            ast.FunctionReference: self.visit_func_ref,
-            ast.BottomConstant: self.visit_bottom_constant,
-            ast.IntegerConstant: self.visit_integer_constant,
-            ast.RealConstant: self.visit_real_constant,
-            ast.CharConstant: self.visit_char_constant,
-            ast.StringConstant: self.visit_string_constant,
-            ast.ArrayExpr: self.visit_array_expr,
-            ast.ArrayListExpr: self.visit_array_list_expr,
-            ast.BooleanConstant: self.visit_boolean_constant,
-            ast.Variable: self.visit_variable,
-            ast.LogicalExpr: self.visit_logical_expr,
-            ast.EqualityExpr: self.visit_equality_expr,
-            ast.ComparisonExpr: self.visit_comparison_expr,
-            ast.ArithExpr: self.visit_arith_expr,
-            ast.Conditional: self.visit_conditional,
-            ast.Is: self.visit_is,
-            ast.IncDecExpr: self.visit_inc_dec_expr,
-            ast.New: self.visit_new,
-            ast.FieldAccess: self.visit_field_access,
-            ast.FunctionCall: self.visit_func_call,
-            ast.Assignment: self.visit_assign,
-            ast.Program: self.visit_program,
-            ast.Block: self.visit_block,
-            ast.ForExpr: self.visit_loop,
-            ast.WhileExpr: self.visit_loop,
-            ast.DoWhileExpr: self.visit_loop,
-            ast.ForExpr.RangeExpr: self.visit_loop_expr,
-            ast.ForExpr.IterableExpr: self.visit_loop_expr,
-            ast.ClassCast: self.visit_class_cast,
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_dispatch_table()
+
+    @classmethod
+    def _build_dispatch_table(cls):
+        # Computed once per visitor class, instead of binding every visitor
+        # method on every call of visit.
+        cls._dispatch_table = {
+            node_cls: getattr(cls, name)
+            for node_cls, name in cls.VISITORS.items()
         }
-        visitor = visitors.get(node.__class__)
+
+    def visit(self, node):
+        visitor = self._dispatch_table.get(node.__class__)
         if visitor is None:
             raise Exception("Cannot find visitor for instance node " +
                             str(node.__class__))
-        return visitor(node)
+        return visitor(self, node)
 
     def visit_program(self, node):
         raise NotImplementedError('visit_program() must be implemented')
@@ -166,6 +181,9 @@ class ASTVisitor():
         raise NotImplementedError('visit_class_cast() must be implemented')
 
 
+ASTVisitor._build_dispatch_table()
+
+
 class DefaultVisitor(ASTVisitor):
 
     def result(self):
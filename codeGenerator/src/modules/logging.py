@@ -1,32 +1,114 @@
+"""
+The logs of the generator, in logs/codeGenerator.log.
+
+The records are formatted by the thread that logs them, but written to the
+file by a QueueListener thread, so that no file I/O happens on the threads
+that generate programs. Every process (e.g. the workers of the server) has
+its own listener.
+
+The messages are str.format templates whose arguments are only formatted if
+the level of the message is enabled:
+
+    log(logger, "Instantiating type constructor {}", stype, level=DEBUG)
+"""
+import atexit
 import logging
+import multiprocessing.util
 import os
+import queue
+from logging import DEBUG, INFO, WARNING, ERROR  # noqa: F401
+from logging.handlers import QueueHandler, QueueListener
 
 from src.args import args
 
 FORMAT = "%(asctime)s [%(module)s] %(levelname)s  %(message)s"
 filename = os.path.join(args.test_directory, "codeGenerator.log")
-logging.basicConfig(filename=filename,
-                    format=FORMAT,
-                    datefmt='%Y-%m-%d %H:%M:%S',
-                    level="INFO")
+_file_handler = logging.FileHandler(filename)
+_file_handler.setFormatter(
+    logging.Formatter(FORMAT, datefmt='%Y-%m-%d %H:%M:%S'))
+_queue_handler = QueueHandler(queue.SimpleQueue())
+_listener = QueueListener(_queue_handler.queue, _file_handler)
+logging.root.addHandler(_queue_handler)
+logging.root.setLevel(INFO)
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def _restart_listener_in_child():
+    # A forked process has a copy of the queue, but not the thread of the
+    # listener; it gets a queue and a listener of its own. The processes of
+    # multiprocessing do not run atexit, but their finalizers.
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, _file_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    multiprocessing.util.Finalize(None, _listener.stop, exitpriority=0)
+
+
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def parse_level(name):
+    """The level of a name (e.g. "DEBUG"), or ValueError if it is unknown."""
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {name}")
+    return level
+
+
+class _Message:
+    """A message formatted when the record is, i.e. only if it is logged."""
+
+    __slots__ = ('name', 'msg', 'args')
+
+    def __init__(self, name, msg, args):
+        self.name = name
+        self.msg = msg
+        self.args = args
+
+    def __str__(self):
+        msg = self.msg.format(*self.args) if self.args else self.msg
+        return f"{self.name} - {msg}"
 
 
 class Logger:
+    """
+    A named logger, whose messages are written to the log file (or printed
+    with stdout).
+
+    Its level (e.g. the log level of a request) takes the place of the level
+    of the log file, None keeps the latter.
+    """
 
-    def __init__(self, name, stdout=False):
+    def __init__(self, name, stdout=False, level=None):
         self.name = name
         self.stdout = stdout
+        self.level = level
         if not self.stdout:
             self.logger_ = logging.getLogger(self.name)
 
-    def log(self, msg):
-        log_message = f"{self.name} - {msg}"
+    def is_enabled_for(self, level):
+        if self.level is not None:
+            return level >= self.level
+        if self.stdout:
+            return level >= INFO
+        return self.logger_.isEnabledFor(level)
+
+    def log(self, msg, *args, level=INFO):
+        if not self.is_enabled_for(level):
+            return
+        message = _Message(self.name, msg, args)
         if self.stdout:
-            print(log_message)
+            print(message)
         else:
-            self.logger_.info(log_message)
+            # The record is handled even if its level is below the level of
+            # the file, the level of this logger has already been checked.
+            self.logger_.handle(
+                self.logger_.makeRecord(self.name, level, __file__, 0, message,
+                                        None, None))
 
 
-def log(logger_: Logger, msg: str):
+def log(logger_: Logger, msg: str, *args, level=INFO):
     if logger_ is not None:
-        logger_.log(msg)
+        logger_.log(msg, *args, level=level)
@@ -0,0 +1,164 @@
+"""
+Opt-in instrumentation of the generation of programs.
+
+A GenerationProfile records the wall and the CPU time of the phases of the
+generation of a program, and counts some of its expensive operations: the
+random draws, the find_subtypes and the is_subtype calls, the deep copies
+made by the generator, and the types that are built.
+
+The phases are marked in the code with `phase(name)`, which does nothing
+while no profile is active. The counters are installed as wrappers only while
+a profile is active (see `profiling`), so they cost nothing otherwise.
+"""
+import cProfile
+import copy
+import functools
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from src import utils
+from src.ir import type_utils as tu
+from src.ir import types as tp
+
+_active = None
+_NO_PHASE = nullcontext()
+
+
+class GenerationProfile():
+
+    def __init__(self):
+        # name -> [calls, wall time, CPU time], in the order they are entered.
+        self.phases = {}
+        self.counters = defaultdict(int)
+
+    def add_phase(self, name, wall, cpu):
+        calls_wall_cpu = self.phases.setdefault(name, [0, 0.0, 0.0])
+        calls_wall_cpu[0] += 1
+        calls_wall_cpu[1] += wall
+        calls_wall_cpu[2] += cpu
+
+    def to_dict(self):
+        return {
+            'phases': [{
+                'name': name,
+                'calls': calls,
+                'wall_ms': wall * 1000,
+                'cpu_ms': cpu * 1000
+            } for name, (calls, wall, cpu) in self.phases.items()],
+            'counters':
+            dict(self.counters)
+        }
+
+
+@contextmanager
+def _timed_phase(profile, name):
+    profile.phases.setdefault(name, [0, 0.0, 0.0])
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        profile.add_phase(name,
+                          time.perf_counter() - wall,
+                          time.process_time() - cpu)
+
+
+def phase(name):
+    """Time the enclosed block as the phase `name` of the active profile.
+
+    Phases can be nested and entered many times; the calls and the times of
+    the same phase are summed.
+    """
+    if _active is None:
+        return _NO_PHASE
+    return _timed_phase(_active, name)
+
+
+def _counting(fun, counters, name):
+
+    @functools.wraps(fun)
+    def inner(*args, **kwargs):
+        counters[name] += 1
+        return fun(*args, **kwargs)
+
+    return inner
+
+
+def _subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        yield from _subclasses(sub)
+
+
+def _install_counters(counters):
+    """Wrap the counted functions, and return a function undoing it."""
+    patches = []
+
+    def patch(obj, name, counter):
+        if isinstance(obj, type):
+            # Only the classes that define the method.
+            if name not in vars(obj):
+                return
+            old = vars(obj)[name]
+        else:
+            old = vars(obj).get(name)
+        patches.append((obj, name, old))
+        counters.setdefault(counter, 0)
+        setattr(obj, name, _counting(getattr(obj, name), counters, counter))
+
+    # Installed on the instance, like the tracing of the random draws.
+    for name in utils.RandomUtils.TRACED_METHODS:
+        patch(utils.randomUtil, name, 'rng_draws')
+    patch(tu, 'find_subtypes', 'find_subtypes')
+    # Every type runs Type.__init__ when it is built (and not when it is
+    # interned without being built).
+    patch(tp.Type, '__init__', 'types_built')
+    for cls in {tp.Type, *_subclasses(tp.Type)}:
+        patch(cls, 'is_subtype', 'is_subtype')
+    # The modules of the generator import deepcopy from copy.
+    for module in list(sys.modules.values()):
+        if (getattr(module, '__name__', '').startswith('src.')
+                and getattr(module, 'deepcopy', None) is copy.deepcopy):
+            patch(module, 'deepcopy', 'deepcopy')
+
+    def uninstall():
+        for obj, name, old in reversed(patches):
+            if old is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, old)
+
+    return uninstall
+
+
+@contextmanager
+def profiling(profile):
+    """Record the phases and the counters of the enclosed block in profile.
+    """
+    global _active
+    uninstall = _install_counters(profile.counters)
+    _active = profile
+    try:
+        yield profile
+    finally:
+        _active = None
+        uninstall()
+
+
+@contextmanager
+def dump_if_slow(path, threshold_ms):
+    """Run the enclosed block under cProfile, and dump its stats to path if
+    it takes at least threshold_ms.
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if (time.perf_counter() - start) * 1000 >= threshold_ms:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profiler.dump_stats(path)
@@ -0,0 +1,140 @@
+"""
+This file includes the persistent cache of the generated programs.
+
+The generated program is a function of the seed, the language, the
+generator configuration (cfg) and the sources of the generator. The cache
+stores the programs in an sqlite database, keyed by all of them. Replays of
+a seed (e.g. to re-measure a suspected regression) are therefore answered
+without running the generator.
+
+The database is bounded by size: when it grows over `max_bytes`, the least
+recently used programs are evicted.
+
+The methods block on the database (up to its busy timeout, if another
+process holds its lock), so the server calls them from a thread of their
+own, one at a time.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+from src import utils
+from src.generators.config import cfg
+
+# Sources that do not affect the generated programs: the modules generated
+# from protobuf/server.proto. The rest of the server is hashed, as it decides
+# e.g. the package of the programs (see generate_package_name).
+_IGNORED_PREFIXES = ('server_pb2', )
+
+
+def generator_version():
+    """Digest of the sources and the resources of the generator.
+
+    Any change to the generator produces a new version, so stale programs
+    are never served from the cache.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(('.pyc', '.pyi')) or \
+                    filename.startswith(_IGNORED_PREFIXES):
+                continue
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as infile:
+                digest.update(infile.read())
+    return digest.hexdigest()
+
+
+class ProgramCache():
+    """Size-bounded LRU cache of generated programs, stored on disk."""
+
+    def __init__(self, path=None, max_bytes=256 * 2**20):
+        self.path = path or os.path.join(utils.get_cache_dir(),
+                                         "programs.sqlite")
+        self.max_bytes = max_bytes
+        self.version = generator_version()
+        # The config of the server does not change once it is running.
+        self.config = hashlib.sha1(cfg.to_json().encode()).hexdigest()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Used from the thread of the server that serves the cache.
+        self._db = sqlite3.connect(self.path,
+                                   timeout=10,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # The commits of every get and put are not synced to disk; a crash
+        # loses at most the last programs, which are generated again.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS programs ("
+                         "key TEXT PRIMARY KEY, "
+                         "text TEXT NOT NULL, "
+                         "generation_time_ms INTEGER NOT NULL, "
+                         "size INTEGER NOT NULL, "
+                         "last_access REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS programs_last_access "
+                         "ON programs (last_access)")
+        # Approximate, other processes may share the database.
+        self._size = self.size()
+
+    def _key(self, language, seed):
+        return "{}:{}:{}:{}".format(language, seed, self.config, self.version)
+
+    def get(self, language, seed):
+        """Return the text and the generation time of a cached program, or
+        None.
+        """
+        key = self._key(language, seed)
+        row = self._db.execute(
+            "SELECT text, generation_time_ms FROM programs WHERE key = ?",
+            (key, )).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute("UPDATE programs SET last_access = ? WHERE key = ?",
+                         (time.time(), key))
+        return row
+
+    def put(self, language, seed, text, generation_time_ms):
+        size = len(text.encode())
+        if size > self.max_bytes:
+            return
+        key = self._key(language, seed)
+        # A replaced program no longer counts towards the size.
+        old = self._db.execute("SELECT size FROM programs WHERE key = ?",
+                               (key, )).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?, ?)",
+            (key, text, generation_time_ms, size, time.time()))
+        self._size += size - (old[0] if old else 0)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        total = self.size()
+        rows = self._db.execute(
+            "SELECT key, size FROM programs ORDER BY last_access")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key, ))
+            total -= size
+        self._db.executemany("DELETE FROM programs WHERE key = ?", stale)
+        self._size = total
+
+    def size(self):
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM programs").fetchone()[0]
+
+    def entries(self):
+        return self._db.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -1,42 +1,311 @@
+import asyncio
+import json
+import os
+import signal
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import ExitStack
 
 import grpc.aio
 
 from src import utils
-from src.generators import Generator
-from src.modules.logging import Logger
+from src.generators import Generator, GenerationTimeout
+from src.modules import profiling
+from src.modules.logging import Logger, parse_level
 from src.server import server_pb2, server_pb2_grpc
+from src.server.program_cache import ProgramCache
 from src.translators.java import JavaTranslator
 from src.translators.kotlin import KotlinTranslator
 import traceback
 
+TRANSLATORS = {'kotlin': KotlinTranslator, 'java': JavaTranslator}
 
-def generate_package_name():
+
+def generate_package_name(seed):
+    # The package name is drawn from the request seed, so that the program
+    # does not depend on the requests previously served by this process.
     utils.randomUtil.reset_word_pool()
+    utils.randomUtil.reset_random(seed)
     packages = (utils.randomUtil.word(), utils.randomUtil.word())
     return packages
 
 
-class GeneratorImpl(server_pb2_grpc.GeneratorServicer):
-    TRANSLATORS = {'kotlin': KotlinTranslator, 'java': JavaTranslator}
-    _log: Logger = Logger("server_class")
+def generate_program(language, seed, deadline=None, log_level=None):
+    """Generate and translate the program of seed, None if it fails.
 
-    def generate_program(self, language, seed):
-        packages = generate_package_name()
+    Raises GenerationTimeout if the generation is still running at deadline
+    (a time.time() value). The generator logs the messages of at least
+    log_level (the level of the log file if None).
+    """
+    with profiling.phase("setup"):
+        packages = generate_package_name(seed)
         utils.randomUtil.reset_word_pool()
         utils.randomUtil.reset_random(seed)
-        translator = self.TRANSLATORS[language]('src.' + packages[0], {})
-        logger = Logger("Generator")
-        generator = Generator(language=language, logger=logger)
-        try:
+        translator = TRANSLATORS[language]('src.' + packages[0], {})
+        logger = Logger("Generator", level=log_level)
+        generator = Generator(language=language,
+                              logger=logger,
+                              deadline=deadline)
+    try:
+        with profiling.phase("generate"):
             program = generator.generate()
+        with profiling.phase("translate"):
             text = utils.translate_program(translator, program)
-            return text
-        except Exception:
-            # This means that we have programming error in transformations
-            err = str(traceback.format_exc())
-            logger.log(err)
-            return None
+        return text
+    except GenerationTimeout as e:
+        logger.log(f"{language} program of seed {seed}: {e}")
+        raise
+    except Exception:
+        # This means that we have programming error in transformations
+        err = str(traceback.format_exc())
+        logger.log(err)
+        return None
+
+
+def generate_timed_program(language,
+                           seed,
+                           profile=False,
+                           slow_ms=0,
+                           profile_dir=None,
+                           deadline=None,
+                           log_level=None):
+    """Generate a program, and return its text, its generation time in ms
+    and its GenerationProfile as a dict (None unless profile is set).
+
+    Raises GenerationTimeout if the generation is still running at deadline.
+
+    With slow_ms > 0, the cProfile stats of the programs that take at least
+    slow_ms are dumped into profile_dir/<language>-<seed>.prof.
+    """
+    gen_profile = profiling.GenerationProfile() if profile else None
+    with ExitStack() as stack:
+        if gen_profile is not None:
+            stack.enter_context(profiling.profiling(gen_profile))
+        if slow_ms > 0:
+            stack.enter_context(
+                profiling.dump_if_slow(
+                    os.path.join(profile_dir, f"{language}-{seed}.prof"),
+                    slow_ms))
+        start_time = time.time()
+        text = generate_program(language, seed, deadline, log_level)
+        elapsed = int((time.time() - start_time) * 1000)
+    return text, elapsed, gen_profile and gen_profile.to_dict()
+
+
+def iter_chunks(text, chunk_size):
+    """Split text into chunks of at most chunk_size characters.
+
+    Chunks end at line boundaries, unless a single line is longer than
+    chunk_size.
+    """
+    assert chunk_size > 0, "chunk_size must be positive"
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end < len(text):
+            newline = text.rfind('\n', start, end)
+            if newline != -1:
+                end = newline + 1
+        yield text[start:end]
+        start = end
+
+
+def _init_worker():
+    # Interrupts are handled by the server process, which shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Every worker owns its copy of randomUtil; load the word pool up front
+    # so that the first request does not pay for it.
+    utils.randomUtil.reset_word_pool()
+
+
+def _ping():
+    return True
+
+
+class GeneratorImpl(server_pb2_grpc.GeneratorServicer):
+    """
+    gRPC servicer of the generator.
+
+    With workers=0 the programs are generated on the event loop, one request
+    at a time. Otherwise every request is dispatched to a pool of `workers`
+    processes and awaited without blocking the loop.
+
+    With cache_size > 0 the programs are also stored in an on-disk cache of
+    at most cache_size bytes, which answers the requests for seeds that have
+    already been generated. The cache is read and written by a thread of its
+    own, off the event loop.
+
+    With profile set, the phases and the counters of the generation of every
+    program are logged and sent along with the program (programs served from
+    the cache have none). With profile_slow_ms > 0, the cProfile stats of the
+    programs that take at least profile_slow_ms are dumped into profile_dir.
+
+    The generation of a program stops at the deadline of its RPC, or after
+    generation_timeout seconds if that comes first (0 for no limit). The RPC
+    then fails with DEADLINE_EXCEEDED, and the seed is appended to
+    timeouts_path (a JSON object per line) to be triaged.
+
+    The generation of a program is logged at log_level, unless its request
+    sets another level.
+    """
+    TRANSLATORS = TRANSLATORS
+    # Default number of programs generateBatch runs ahead of its client, per
+    # worker process.
+    BATCH_WINDOW_PER_WORKER = 2
+    # Default maximum number of characters per chunk of generateStream.
+    CHUNK_SIZE = 2**20
+    _log: Logger = Logger("server_class")
+
+    def __init__(self,
+                 workers=0,
+                 cache_size=0,
+                 profile=False,
+                 profile_slow_ms=0,
+                 profile_dir=None,
+                 generation_timeout=0,
+                 timeouts_path=None,
+                 log_level="INFO"):
+        self.workers = workers
+        self.profile = profile
+        self.profile_slow_ms = profile_slow_ms
+        self.profile_dir = profile_dir
+        self.generation_timeout = generation_timeout
+        self.timeouts_path = timeouts_path
+        self.timeouts = 0
+        self.log_level = parse_level(log_level)
+        self._executor = None
+        self.cache = None
+        self._cache_executor = None
+        if workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                 initializer=_init_worker)
+            # Fork the workers now, before the gRPC server is started.
+            wait([self._executor.submit(_ping) for _ in range(workers)])
+            self._log.log(f"Started {workers} generator workers")
+        # Opened after forking, the workers must not share the connection.
+        if cache_size > 0:
+            self.cache = ProgramCache(max_bytes=cache_size)
+            self._cache_executor = ThreadPoolExecutor(max_workers=1)
+            self._log.log(f"Program cache {self.cache.path}: "
+                          f"{self.cache.entries()} programs")
+
+    def generate_program(self, language, seed):
+        return generate_program(language, seed)
+
+    @staticmethod
+    def _rpc_deadline(context):
+        """The deadline of the RPC of context as a time.time() value, None
+        if the client has not set one."""
+        remaining = context.time_remaining()
+        return None if remaining is None else time.time() + remaining
+
+    def _record_timeout(self, language, seed, limit):
+        self.timeouts += 1
+        self._log.log(f"The generation of the {language} program of seed "
+                      f"{seed} has exceeded its deadline ({limit:.0f}ms)")
+        if self.timeouts_path is None:
+            return
+        os.makedirs(os.path.dirname(self.timeouts_path), exist_ok=True)
+        with open(self.timeouts_path, "a") as out:
+            out.write(
+                json.dumps(
+                    dict(language=language,
+                         seed=seed,
+                         timeout_ms=round(limit),
+                         time=time.time())) + "\n")
+
+    async def _in_cache_thread(self, func, *args):
+        """Await func(*args) run by the thread of the cache."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cache_executor, func, *args)
+
+    async def _request_log_level(self, request, context):
+        """The log level of request, the level of the server if it has none.
+        """
+        if not request.log_level:
+            return self.log_level
+        try:
+            return parse_level(request.log_level)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+    async def _generate(self, language, seed, deadline=None, log_level=None):
+        """Generate the program of seed, or raise GenerationTimeout if it is
+        not generated by deadline (the deadline of the RPC)."""
+        cached = None
+        profile = None
+        if self.cache is not None:
+            cached = await self._in_cache_thread(self.cache.get, language,
+                                                 seed)
+        if cached is not None:
+            text, elapsed = cached
+        else:
+            start = time.time()
+            if deadline is not None and deadline <= start:
+                # E.g. a program that has waited past the deadline.
+                raise GenerationTimeout(
+                    "The deadline has passed before the generation started")
+            if self.generation_timeout > 0:
+                limit = start + self.generation_timeout
+                deadline = limit if deadline is None else min(deadline, limit)
+            args = (language, seed, self.profile, self.profile_slow_ms,
+                    self.profile_dir, deadline, log_level or self.log_level)
+            try:
+                if self._executor is None:
+                    text, elapsed, profile = generate_timed_program(*args)
+                else:
+                    loop = asyncio.get_running_loop()
+                    text, elapsed, profile = await loop.run_in_executor(
+                        self._executor, generate_timed_program, *args)
+            except GenerationTimeout:
+                self._record_timeout(language, seed, (deadline - start) * 1000)
+                raise
+        if self.cache is not None and cached is None and text is not None:
+            # The response does not wait for the program to be stored.
+            self._cache_executor.submit(self.cache.put, language, seed, text,
+                                        elapsed)
+        program = server_pb2.Program(language=language,
+                                     text=text,
+                                     generation_time_ms=elapsed,
+                                     seed=seed)
+        if profile is not None:
+            self._log.log(
+                "Generation profile " +
+                json.dumps(dict(language=language, seed=seed, **profile)))
+            program.profile.CopyFrom(
+                server_pb2.GenerationProfile(phases=[
+                    server_pb2.GenerationProfile.Phase(**phase)
+                    for phase in profile['phases']
+                ],
+                                             counters=profile['counters']))
+        return program
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            # Let the pending puts finish before the database is closed.
+            self._cache_executor.shutdown(wait=True)
+            self._cache_executor = None
+            self._log.log(f"Program cache: {self.cache.hits} hits, "
+                          f"{self.cache.misses} misses")
+            self.cache.close()
+            self.cache = None
+        if self.timeouts:
+            self._log.log(f"{self.timeouts} generations exceeded their "
+                          f"deadline")
+
+    async def getCacheStats(self, request: server_pb2.CacheStatsRequest,
+                            context: grpc.aio.ServicerContext):
+        if self.cache is None:
+            return server_pb2.CacheStats()
+        entries = await self._in_cache_thread(self.cache.entries)
+        size = await self._in_cache_thread(self.cache.size)
+        return server_pb2.CacheStats(hits=self.cache.hits,
+                                     misses=self.cache.misses,
+                                     entries=entries,
+                                     size_bytes=size)
 
     async def generateKotlin(self, request: server_pb2.GenerateRequest,
                              context: grpc.aio.ServicerContext):
@@ -44,11 +313,19 @@ class GeneratorImpl(server_pb2_grpc.GeneratorServicer):
         self._log.log(
             f"Incoming request to generate a Kotlin program: seed {request.seed}"
         )
-        text = self.generate_program(language="kotlin", seed=request.seed)
+        log_level = await self._request_log_level(request, context)
+        try:
+            program = await self._generate(
+                language="kotlin",
+                seed=request.seed,
+                deadline=self._rpc_deadline(context),
+                log_level=log_level)
+        except GenerationTimeout as e:
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
         self._log.log(
-            f"Kotlin program generation completed successfully. Elapsed time {time.time() - start_time}ms"
+            f"Kotlin program generation completed successfully. Elapsed time {(time.time() - start_time) * 1000:.0f}ms"
         )
-        return server_pb2.Program(language="kotlin", text=text)
+        return program
 
     async def generateJava(self, request: server_pb2.GenerateRequest,
                            context: grpc.aio.ServicerContext):
@@ -56,8 +333,149 @@ class GeneratorImpl(server_pb2_grpc.GeneratorServicer):
         self._log.log(
             f"Incoming request to generate a Java program: seed {request.seed}"
         )
-        text = self.generate_program(language="java", seed=request.seed)
+        log_level = await self._request_log_level(request, context)
+        try:
+            program = await self._generate(
+                language="java",
+                seed=request.seed,
+                deadline=self._rpc_deadline(context),
+                log_level=log_level)
+        except GenerationTimeout as e:
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
+        self._log.log(
+            f"Java program generation completed successfully. Elapsed time {(time.time() - start_time) * 1000:.0f}ms"
+        )
+        return program
+
+    async def generatePair(self, request: server_pb2.GenerateRequest,
+                           context: grpc.aio.ServicerContext):
+        start_time = time.time()
+        self._log.log(
+            f"Incoming request to generate a pair of programs: seed {request.seed}"
+        )
+        deadline = self._rpc_deadline(context)
+        log_level = await self._request_log_level(request, context)
+        # With a worker pool both programs are generated concurrently.
+        # Otherwise they are generated one after the other on the loop, and
+        # the Kotlin program gets half of the time of the RPC, so that a slow
+        # one does not leave the Java program without time.
+        kotlin_deadline = deadline
+        if self._executor is None and deadline is not None:
+            kotlin_deadline = (time.time() + deadline) / 2
+        try:
+            kotlin, java = await asyncio.gather(
+                self._generate(language="kotlin",
+                               seed=request.seed,
+                               deadline=kotlin_deadline,
+                               log_level=log_level),
+                self._generate(language="java",
+                               seed=request.seed,
+                               deadline=deadline,
+                               log_level=log_level))
+        except GenerationTimeout as e:
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
+        self._log.log(
+            f"Pair generation completed successfully. Elapsed time {(time.time() - start_time) * 1000:.0f}ms "
+            f"(kotlin {kotlin.generation_time_ms}ms, java {java.generation_time_ms}ms)"
+        )
+        return server_pb2.ProgramPair(kotlin=kotlin, java=java)
+
+    async def generateBatch(self, request: server_pb2.BatchRequest,
+                            context: grpc.aio.ServicerContext):
+        """
+        Stream the programs of seeds [seed_start, seed_start + count) in the
+        order they are completed. At most `window` programs are generated
+        ahead of the client. The programs that fail or time out have no text;
+        the batch is aborted only when the deadline of the RPC has passed.
+        """
+        start_time = time.time()
+        languages = list(request.languages) or list(self.TRANSLATORS)
+        unknown = [l for l in languages if l not in self.TRANSLATORS]
+        if unknown:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                                f"Unsupported languages: {unknown}")
+        window = request.window or \
+            max(1, self.workers) * self.BATCH_WINDOW_PER_WORKER
+        self._log.log(
+            f"Incoming request to generate a batch of programs: seeds "
+            f"{request.seed_start}..{request.seed_start + request.count - 1}, "
+            f"languages {languages}, window {window}")
+        deadline = self._rpc_deadline(context)
+        jobs = ((seed, language)
+                for seed in range(request.seed_start, request.seed_start +
+                                  request.count) for language in languages)
+        # The seed and the language of the pending tasks.
+        pending = {}
+        try:
+            while True:
+                for seed, language in jobs:
+                    task = asyncio.ensure_future(
+                        self._generate(language, seed, deadline))
+                    pending[task] = (seed, language)
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    seed, language = pending.pop(task)
+                    try:
+                        yield task.result()
+                    except GenerationTimeout as e:
+                        # Only the deadline of the RPC ends the batch, a seed
+                        # over --generation-timeout fails like an error.
+                        if deadline is not None and time.time() >= deadline:
+                            await context.abort(
+                                grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
+                        yield server_pb2.Program(language=language, seed=seed)
+        finally:
+            # The client has gone away, drop the programs generated ahead.
+            for task in pending:
+                task.cancel()
+        self._log.log(
+            f"Batch generation completed successfully. Elapsed time {(time.time() - start_time) * 1000:.0f}ms"
+        )
+
+    async def generateStream(self, request: server_pb2.StreamRequest,
+                             context: grpc.aio.ServicerContext):
+        """
+        Send the program of a seed split into chunks, so that programs larger
+        than the maximum message size can be served. The program is generated
+        (or read from the cache) whole before its first chunk is sent.
+        """
+        if request.language not in self.TRANSLATORS:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                                f"Unsupported language: {request.language}")
+        if request.chunk_size < 0:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                                f"Invalid chunk size: {request.chunk_size}")
+        start_time = time.time()
+        self._log.log(
+            f"Incoming request to stream a {request.language} program: seed "
+            f"{request.seed}")
+        try:
+            program = await self._generate(request.language, request.seed,
+                                           self._rpc_deadline(context))
+        except GenerationTimeout as e:
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
+        chunk_size = request.chunk_size or self.CHUNK_SIZE
+        # A program that could not be generated is a single empty chunk.
+        chunks = iter_chunks(program.text, chunk_size)
+        chunk = next(chunks, "")
+        for next_chunk in chunks:
+            yield server_pb2.ProgramChunk(
+                language=program.language,
+                seed=program.seed,
+                text=chunk,
+                generation_time_ms=program.generation_time_ms)
+            chunk = next_chunk
+        yield server_pb2.ProgramChunk(
+            language=program.language,
+            seed=program.seed,
+            text=chunk,
+            generation_time_ms=program.generation_time_ms,
+            last=True)
         self._log.log(
-            f"Java program generation completed successfully. Elapsed time {time.time() - start_time}ms"
+            f"Program streamed successfully. Elapsed time {(time.time() - start_time) * 1000:.0f}ms"
         )
-        return server_pb2.Program(language="java", text=text)
@@ -13,5 +13,15 @@ class BaseTranslator(ASTVisitor):
             raise Exception('You have to translate the program first')
         return self.program
 
+    def pop_children_res(self, children):
+        """Pop the results of the given children from _children_res."""
+        len_c = len(children)
+        if not len_c:
+            return []
+        res = self._children_res[-len_c:]
+        # Shrink the stack in place, instead of copying the rest of it.
+        del self._children_res[-len_c:]
+        return res
+
     def get_type_name(self, t: tp.Type) -> str:
         raise NotImplementedError('get_type_name() must be implemented')
@@ -190,14 +190,6 @@ class JavaTranslator(BaseTranslator):
         return "{}<{}>".format(
             t.name, ", ".join([self.type_arg2str(ta) for ta in t.type_args]))
 
-    def pop_children_res(self, children):
-        len_c = len(children)
-        if not len_c:
-            return []
-        res = self._children_res[-len_c:]
-        self._children_res = self._children_res[:-len_c]
-        return res
-
     def _get_main_prefix(self, decl_type, name):
         ns_decls = list(
             self.context.get_namespaces_decls(self._namespace, name,
@@ -76,14 +76,6 @@ class KotlinTranslator(BaseTranslator):
         return "{}<{}>".format(
             t.name, ", ".join([self.type_arg2str(ta) for ta in t.type_args]))
 
-    def pop_children_res(self, children):
-        len_c = len(children)
-        if not len_c:
-            return []
-        res = self._children_res[-len_c:]
-        self._children_res = self._children_res[:-len_c]
-        return res
-
     def visit_program(self, node):
         self.context = node.context
         children = node.children()
@@ -113,19 +105,16 @@ class KotlinTranslator(BaseTranslator):
         for c in children:
             c.accept(self)
         children_res = self.pop_children_res(children)
-        res = "{" if not is_lambda else ""
-        res += "\n" + "\n".join(children_res[:-1])
-        if children_res[:-1]:
-            res += "\n"
+        stmts = children_res[:-1]
         ret_keyword = "return " if node.is_func_block and not is_unit and not is_lambda else ""
-        if children_res:
-            res += " " * self.ident + ret_keyword + \
-                   children_res[-1] + "\n" + \
-                   " " * self.ident
-        else:
-            res += " " * self.ident + ret_keyword + "\n" + \
-                   " " * self.ident
-        res += "}" if not is_lambda else ""
+        ident = " " * self.ident
+        # The statements are copied once, when the chunks are joined.
+        res = "".join([
+            "{" if not is_lambda else "", "\n", "\n".join(stmts),
+            "\n" if stmts else "", ident, ret_keyword,
+            children_res[-1] if children_res else "", "\n", ident,
+            "}" if not is_lambda else ""
+        ])
         self.is_unit = is_unit
         self.is_lambda = is_lambda
         self._children_res.append(res)
@@ -173,36 +162,30 @@ class KotlinTranslator(BaseTranslator):
 
         is_sam = tu.is_sam(self.context, cls_decl=node)
         class_prefix = "interface" if is_sam else node.get_class_prefix()
-        body = ""
-        if function_res:
-            body = " {{\n{function_res}\n{old_ident}}}".format(
-                function_res="\n\n".join(function_res),
-                old_ident=" " * old_ident)
-
-        res = "{ident}{f}{o}{p} {n}".format(
-            ident=" " * old_ident,
-            f="fun " if is_sam else "",
-            o="open " if (not node.is_final
-                          and node.class_type != ast.ClassDeclaration.INTERFACE
-                          and not is_sam) else "",
-            p=class_prefix,
-            n=node.name,
-            tps="<" + type_parameters_res + ">" if type_parameters_res else "",
-            fields="(" + ", ".join(field_res) + ")" if field_res else "",
-            s=": " + ", ".join(superclasses_res) if superclasses_res else "",
-            body=body)
+        res = [
+            "{ident}{f}{o}{p} {n}".format(
+                ident=" " * old_ident,
+                f="fun " if is_sam else "",
+                o="open " if
+                (not node.is_final
+                 and node.class_type != ast.ClassDeclaration.INTERFACE
+                 and not is_sam) else "",
+                p=class_prefix,
+                n=node.name)
+        ]
 
         if type_parameters_res:
-            res = "{}<{}>".format(res, type_parameters_res)
+            res.append("<{}>".format(type_parameters_res))
         if field_res:
-            res = "{}({})".format(res, ", ".join(field_res))
+            res.append("({})".format(", ".join(field_res)))
         if superclasses_res:
-            res += ": " + ", ".join(superclasses_res)
+            res.append(": " + ", ".join(superclasses_res))
         if function_res:
-            res += " {\n" + "\n\n".join(
-                function_res) + "\n" + " " * old_ident + "}"
+            res.extend([
+                " {\n", "\n\n".join(function_res), "\n", " " * old_ident, "}"
+            ])
         self.ident = old_ident
-        self._children_res.append(res)
+        self._children_res.append("".join(res))
 
     @append_to
     def visit_type_param(self, node):
@@ -301,17 +284,19 @@ class KotlinTranslator(BaseTranslator):
         prefix += "" if node.body is not None else "abstract "
         type_params = ("<" + type_parameters_res +
                        ">" if type_parameters_res else "")
-        res = prefix + "fun " + type_params + node.name + "(" + ", ".join(
-            param_res) + ")"
+        res = [
+            prefix, "fun ", type_params, node.name, "(", ", ".join(param_res),
+            ")"
+        ]
         if node.ret_type:
-            res += ": " + self.get_type_name(node.ret_type)
+            res.extend([": ", self.get_type_name(node.ret_type)])
         if body_res:
             sign = "=" if is_expression and node.get_type() != kt.Unit else ""
-            res += " " + sign + "\n" + body_res
+            res.extend([" ", sign, "\n", body_res])
         self.ident = old_ident
         self.is_unit = prev_is_unit
         self._cast_integers = prev_c
-        self._children_res.append(res)
+        self._children_res.append("".join(res))
 
     @append_to
     def visit_lambda(self, node):
@@ -1,11 +1,12 @@
-import typing
 from collections import defaultdict
+import hashlib
 import random as rnd
 import string
 import pickle
 import os
 import sys
 import inspect
+import tempfile
 
 from ordered_set import OrderedSet
 
@@ -97,6 +98,64 @@ def save_text(path, text):
         out.write(text)
 
 
+def get_cache_dir():
+    """Directory for on-disk caches; set PERFFECT_CACHE_DIR to override it.
+    """
+    cache_dir = os.environ.get("PERFFECT_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "perffect")
+
+
+def save_bytes_atomic(path, data):
+    """Write data to path, so that readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def sample_words(path, seed, k):
+    """Sample k words out of the words file using a generator seeded with
+    `seed`.
+
+    It returns the sampled words (without duplicates) along with the state
+    of the generator after sampling. The result is cached on disk, keyed by
+    the seed, k and the hash of the file, because reading and sampling the
+    whole file dominates the start-up time.
+    """
+    with open(path, 'rb') as infile:
+        digest = hashlib.sha1(infile.read()).hexdigest()
+    cache_path = os.path.join(get_cache_dir(),
+                              "words-{}-{}-{}.pickle".format(seed, k, digest))
+    try:
+        with open(cache_path, 'rb') as infile:
+            blob, state = pickle.load(infile)
+        return blob.decode('utf-8').split('\n'), state
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+    r = rnd.Random(seed)
+    words = list(OrderedSet(r.sample(read_lines(path), k)))
+    state = r.getstate()
+    try:
+        save_bytes_atomic(
+            cache_path,
+            pickle.dumps(('\n'.join(words).encode('utf-8'), state),
+                         protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        # The cache is an optimization; a read-only home is fine.
+        pass
+    return words, state
+
+
 def path2set(path):
     if os.path.isfile(path):
         with open(path, 'r') as f:
@@ -111,20 +170,126 @@ def get_reserved_words(resource_path, language):
     return path2set(path)
 
 
-# for debugging purposes
-def random_inspect(random_fun):
+class WordPool():
+    """A pool of unique words from which we draw words without replacement.
+
+    Words keep their initial order, and the i-th word of the pool is always
+    the i-th word that has not been drawn yet. So, drawing the word with
+    index `r.choice(range(len(pool)))` gives the same sequence of words as
+    `r.choice(tuple(words))` followed by the removal of the chosen word.
+
+    The remaining words are tracked by a Fenwick tree over the initial
+    words, which makes both lookup and removal O(log n). Resetting the pool
+    to its initial state copies a flat list of ints.
+    """
+
+    def __init__(self, words):
+        self._words = list(words)
+        self._index = {word: i for i, word in enumerate(self._words)}
+        self._initial = (self._build_tree([1] * len(self._words)),
+                         bytearray(b'\x01') * len(self._words),
+                         len(self._words))
+        self.reset()
+
+    @staticmethod
+    def _build_tree(counts):
+        tree = [0] + counts
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        return tree
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, word):
+        i = self._index.get(word)
+        return i is not None and bool(self._present[i])
+
+    def __iter__(self):
+        return (w for i, w in enumerate(self._words) if self._present[i])
+
+    def _find(self, index):
+        """Find the position of the index-th remaining word."""
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        tree = self._tree
+        size = len(tree)
+        while step:
+            nxt = pos + step
+            if nxt < size and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def _discard_at(self, tree, present, pos):
+        present[pos] = 0
+        i = pos + 1
+        size = len(tree)
+        while i < size:
+            tree[i] -= 1
+            i += i & -i
+
+    def pop(self, index):
+        """Remove and return the index-th remaining word."""
+        if not 0 <= index < self._len:
+            raise IndexError('word pool index out of range')
+        pos = self._find(index)
+        self._discard_at(self._tree, self._present, pos)
+        self._len -= 1
+        return self._words[pos]
+
+    def remove_words(self, words):
+        """Remove the given words from the pool and from its initial state.
+        """
+        tree, present, length = self._initial
+        for word in words:
+            pos = self._index.get(word)
+            if pos is None:
+                continue
+            if present[pos]:
+                self._discard_at(tree, present, pos)
+                length -= 1
+            if self._present[pos]:
+                self._discard_at(self._tree, self._present, pos)
+                self._len -= 1
+        self._initial = (tree, present, length)
+
+    def snapshot(self):
+        return list(self._tree), bytearray(self._present), self._len
+
+    def restore(self, snapshot):
+        tree, present, length = snapshot
+        self._tree = list(tree)
+        self._present = bytearray(present)
+        self._len = length
+
+    def reset(self):
+        """Put back all the words that have been drawn so far."""
+        self.restore(self._initial)
+
+
+def random_inspect(random_fun, logger):
+    """Wrap a bound RandomUtils draw so that every call is logged together
+    with its caller, arguments and result.
+
+    This is only used when tracing is enabled (see
+    `RandomUtils.enable_tracing`), because walking the stack on every draw
+    is way too expensive for production runs.
+    """
 
     def inner(*args, **kwargs):
-        curframe = inspect.currentframe()
-        calframe = inspect.getouterframes(curframe, 2)
-        from_ = calframe[1][1]
-        line = calframe[1][2]
-        caller = calframe[1][3]
-        callings = calframe[1][4]
+        caller = inspect.getframeinfo(sys._getframe(1), context=1)
         result = random_fun(*args, **kwargs)
-        str_ = "caller - {}:{}:{}; method - {}; args - {}, kwargs - {}, result - {}".format(
-            from_, line, caller, callings, args[1:], kwargs, result)
-        # print(str_)
+        callings = caller.code_context[0].strip() \
+            if caller.code_context else None
+        logger.log("caller - {}:{}:{}; method - {}; args - {}, kwargs - {}, "
+                   "result - {}".format(caller.filename, caller.lineno,
+                                        caller.function, callings, args,
+                                        kwargs, result))
         return result
 
     return inner
@@ -134,115 +299,112 @@ class RandomUtils():
     resource_path = os.path.join(os.path.split(__file__)[0], "resources")
 
     WORD_POOL_LEN = 10000
-    # Construct a random word pool of size 'WORD_POOL_LEN'.
-    WORDS: OrderedSet
-    INITIAL_WORDS: OrderedSet
 
-    previous_call: str
-    call: str = ''
-    previous_result: typing.Any
-    result: typing.Any = None
+    # Draw methods that are logged when tracing is enabled.
+    TRACED_METHODS = ('bool', 'word', 'integer', 'char', 'choice', 'sample',
+                      'str', 'caps', 'range')
+    # Set this environment variable to a non-empty value to trace every draw.
+    TRACE_ENV = "PERFFECT_TRACE_RANDOM"
 
     def __init__(self):
         self.seed = -8778892910913690087  # rnd.randrange(sys.maxsize)
         self.r = rnd.Random(self.seed)
-        self.WORDS = OrderedSet(
-            self.sample(read_lines(os.path.join(self.resource_path, 'words')),
-                        self.WORD_POOL_LEN))
-        self.INITIAL_WORDS = OrderedSet(self.WORDS)
+        self._seed_state = self.r.getstate()
+        self._words = None
+        self.tracing = False
+        if os.environ.get(self.TRACE_ENV):
+            self.enable_tracing()
+
+    @property
+    def WORDS(self) -> WordPool:
+        """The random word pool of size 'WORD_POOL_LEN'.
+
+        It is constructed on first use, so that importing this module does
+        not read the words file.
+        """
+        if self._words is None:
+            words, state = sample_words(
+                os.path.join(self.resource_path, 'words'), self.seed,
+                self.WORD_POOL_LEN)
+            # The pool used to be sampled with `self.r` at construction
+            # time. If nothing has been drawn since then, continue from the
+            # state the sampling would have left behind, so that the first
+            # draws stay the same.
+            if self.r.getstate() == self._seed_state:
+                self.r.setstate(state)
+            self._words = WordPool(words)
+        return self._words
+
+    def enable_tracing(self, logger=None):
+        """Log the caller, the arguments and the result of every draw.
+
+        The traced wrappers are installed on the instance, so they shadow
+        the plain methods only while tracing is on. Use it for debugging
+        divergences between the Kotlin and the Java runs of the same seed
+        (see random_logs_processor.py).
+        """
+        if self.tracing:
+            return
+        if logger is None:
+            # Import it here, because the logging module configures the
+            # log file at import time.
+            from src.modules.logging import Logger
+            logger = Logger("RandomUtils")
+        for name in self.TRACED_METHODS:
+            setattr(self, name, random_inspect(getattr(self, name), logger))
+        self.tracing = True
+
+    def disable_tracing(self):
+        if not self.tracing:
+            return
+        for name in self.TRACED_METHODS:
+            delattr(self, name)
+        self.tracing = False
 
     def reset_random(self, seed=None):
         seed = seed if seed else self.seed
         self.r = rnd.Random(seed)
 
     def reset_word_pool(self):
-        self.WORDS = OrderedSet(self.INITIAL_WORDS)
+        self.WORDS.reset()
 
-    @random_inspect
     def bool(self, prob=0.5):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = self.r.random() < prob
-        self.call = "bool"
-        return self.result
+        return self.r.random() < prob
 
-    @random_inspect
     def word(self):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        word = self.r.choice(tuple(self.WORDS))
-        self.WORDS.remove(word)
-        self.result = word
-        self.call = "word"
-        return word
-
-    @random_inspect
+        words = self.WORDS
+        return words.pop(self.r.choice(range(len(words))))
+
     def remove_reserved_words(self, language):
         reserved_words = get_reserved_words(self.resource_path, language)
-        self.INITIAL_WORDS = self.INITIAL_WORDS - reserved_words
-        self.WORDS = self.WORDS - reserved_words
+        self.WORDS.remove_words(reserved_words)
 
-    @random_inspect
     def integer(self, min_int=0, max_int=10):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = self.r.randint(min_int, max_int)
-        self.call = "integer {} {}".format(min_int, max_int)
-        return self.result
+        return self.r.randint(min_int, max_int)
 
-    @random_inspect
     def char(self):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = self.r.choice(string.ascii_letters + string.digits)
-        self.call = "char"
-        return self.result
+        return self.r.choice(string.ascii_letters + string.digits)
 
-    @random_inspect
     def choice(self, choices):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = self.r.choice(choices)
-        self.call = "choice {}".format(str(choices))
-        return self.result
+        return self.r.choice(choices)
 
-    @random_inspect
     def sample(self, choices, k=None):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.call = "sample {} k={}".format(str(choices), k)
         k = k or self.integer(0, len(choices))
-        self.result = self.r.sample(choices, k)
-        return self.result
+        return self.r.sample(choices, k)
 
-    @random_inspect
     def str(self, length=5):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = ''.join(
+        return ''.join(
             self.r.sample(string.ascii_letters + string.digits, length))
-        self.call = "str {}".format(length)
-        return self.result
 
-    @random_inspect
     def caps(self, length=1, blacklist=None):
-        self.previous_result = self.result
-        self.previous_call = self.call
         blacklist = blacklist if blacklist is not None else []
-        self.call = "caps {} {}".format(length, str(blacklist))
         while True:
             res = ''.join(self.r.sample(string.ascii_uppercase, length))
             if res not in blacklist:
-                self.result = res
                 return res
 
-    @random_inspect
     def range(self, from_value, to_value):
-        self.previous_result = self.result
-        self.previous_call = self.call
-        self.result = range(0, self.integer(from_value, to_value))
-        self.call = "range {} {}".format(from_value, to_value)
-        return self.result
+        return range(0, self.integer(from_value, to_value))
 
 
 randomUtil = RandomUtils()
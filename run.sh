@@ -19,7 +19,8 @@ fi
 cp testOracle/build/libs/testOracle-1.0-SNAPSHOT.jar testOracle-1.0-SNAPSHOT.jar
 
 echo 'Start grpc server...'
-python3 codeGenerator/hephaestus.py &
+# Two workers generate the Kotlin and the Java program of a pair concurrently.
+python3 codeGenerator/hephaestus.py --workers 2 &
 grpcPID=$!
 
 sleep 1
@@ -13,9 +13,10 @@ import com.vitekkor.perffect.project.Project
 import com.vitekkor.perffect.project.toProject
 import com.vitekkor.perffect.util.BodySurgeon.replaceJavaMainFun
 import com.vitekkor.perffect.util.BodySurgeon.replaceKotlinMainFun
+import io.grpc.Status
+import io.grpc.StatusException
 import kotlinx.coroutines.Dispatchers
 import kotlinx.coroutines.withContext
-import kotlinx.coroutines.withTimeoutOrNull
 import kotlinx.serialization.encodeToString
 import kotlinx.serialization.json.Json
 import mu.KotlinLogging.logger
@@ -24,9 +25,6 @@ import java.io.File
 import java.time.Duration
 import java.time.Instant
 import kotlin.random.Random
-import kotlin.time.ExperimentalTime
-import kotlin.time.measureTimedValue
-import kotlin.time.toKotlinDuration
 
 val javaStat = Stat()
 val kotlinStat = Stat()
@@ -69,7 +67,6 @@ suspend fun main() {
 class TestOracle {
     private val log = logger {}
 
-    @OptIn(ExperimentalTime::class)
     suspend fun run() {
         log.info("Start test oracle")
         val client = CodeGeneratorClient.create()
@@ -81,21 +78,22 @@ class TestOracle {
             javaCompiler.cleanUp()
             try {
                 log.info("$SEED $seed")
-                // Generate Kotlin program and measure generation time. Timeout 2 minutes.
-                val (kotlin, kotlinGenerationTime) = withTimeoutOrNull(Duration.ofMinutes(2).toKotlinDuration()) {
-                    measureTimedValue { client.generateKotlin(seed) }
-                }.also { if (it == null) log.warn { "$KOTLIN_PROGRAM timeout exceeded" } } ?: continue
+                // Generate both programs in one call, the server measures generation time. Timeout 2 minutes,
+                // the server stops generating at the deadline.
+                val programs = try {
+                    client.generatePair(seed, Duration.ofMinutes(2))
+                } catch (e: StatusException) {
+                    if (e.status.code != Status.Code.DEADLINE_EXCEEDED) throw e
+                    log.warn { "$KOTLIN_PROGRAM and $JAVA_PROGRAM timeout exceeded" }
+                    continue
+                }
+                val kotlin = programs.kotlin
+                val java = programs.java
                 // Save stat
                 kotlinStat.totalNumberOfPrograms++
-                kotlinStat.averageGenerationTimeMs += kotlinGenerationTime.inWholeMilliseconds
-
-                // Generate Java program and measure generation time. Timeout 2 minutes.
-                val (java, javaGenerationTime) = withTimeoutOrNull(Duration.ofMinutes(2).toKotlinDuration()) {
-                    measureTimedValue { client.generateJava(seed) }
-                }.also { if (it == null) log.warn { "$JAVA_PROGRAM timeout exceeded" } } ?: continue
-                // Save stat
+                kotlinStat.averageGenerationTimeMs += kotlin.generationTimeMs
                 javaStat.totalNumberOfPrograms++
-                javaStat.averageGenerationTimeMs += javaGenerationTime.inWholeMilliseconds
+                javaStat.averageGenerationTimeMs += java.generationTimeMs
 
                 if (kotlin.text.isBlank()) {
                     log.error { "$KOTLIN_PROGRAM is empty - seed $seed" }
@@ -2,30 +2,88 @@ package com.vitekkor.perffect.client
 
 import io.grpc.ManagedChannel
 import io.grpc.ManagedChannelBuilder
+import kotlinx.coroutines.flow.Flow
 import src.server.GeneratorGrpcKt
 import src.server.Server
+import src.server.batchRequest
 import src.server.generateRequest
+import src.server.streamRequest
 import java.io.Closeable
+import java.time.Duration
 import java.util.concurrent.TimeUnit
 
 class CodeGeneratorClient(private val channel: ManagedChannel) : Closeable {
 
     private val stub: GeneratorGrpcKt.GeneratorCoroutineStub by lazy { GeneratorGrpcKt.GeneratorCoroutineStub(channel) }
 
-    suspend fun generateKotlin(seed: Long): Server.Program {
-        val request = generateRequest {
-            this.seed = seed
+    suspend fun generateKotlin(seed: Long, timeout: Duration? = null, logLevel: String? = null): Server.Program {
+        val request = requestOf(seed, logLevel)
+        return stub.withTimeout(timeout).generateKotlin(request)
+    }
+
+    suspend fun generateJava(seed: Long, timeout: Duration? = null, logLevel: String? = null): Server.Program {
+        val request = requestOf(seed, logLevel)
+        return stub.withTimeout(timeout).generateJava(request)
+    }
+
+    suspend fun generatePair(seed: Long, timeout: Duration? = null, logLevel: String? = null): Server.ProgramPair {
+        val request = requestOf(seed, logLevel)
+        return stub.withTimeout(timeout).generatePair(request)
+    }
+
+    /**
+     * Streams the programs of seeds [seedStart, seedStart + count) in the order they are generated.
+     * The programs that fail or time out have an empty text.
+     * @param languages languages to generate for every seed, all of them if empty
+     * @param window maximum number of programs the server generates ahead, 0 for the server default
+     */
+    fun generateBatch(
+        seedStart: Long,
+        count: Long,
+        languages: List<String> = emptyList(),
+        window: Int = 0
+    ): Flow<Server.Program> {
+        val request = batchRequest {
+            this.seedStart = seedStart
+            this.count = count
+            this.languages.addAll(languages)
+            this.window = window
         }
-        return stub.generateKotlin(request)
+        return stub.generateBatch(request)
     }
 
-    suspend fun generateJava(seed: Long): Server.Program {
-        val request = generateRequest {
+    /**
+     * Receives the program of [seed] split into chunks, for programs that exceed the maximum message size.
+     * The program is generated whole before the first chunk is sent.
+     * The texts of the chunks, in order, make up the program; the last chunk has `last` set.
+     * @param chunkSize maximum number of characters per chunk (not negative), 0 for the server default
+     */
+    fun generateStream(seed: Long, language: String, chunkSize: Int = 0): Flow<Server.ProgramChunk> {
+        val request = streamRequest {
             this.seed = seed
+            this.language = language
+            this.chunkSize = chunkSize
         }
-        return stub.generateJava(request)
+        return stub.generateStream(request)
     }
 
+    /**
+     * @param logLevel level of the logs of the generation (DEBUG, INFO, WARNING, ERROR), the server default if null
+     */
+    private fun requestOf(seed: Long, logLevel: String?) = generateRequest {
+        this.seed = seed
+        if (logLevel != null) {
+            this.logLevel = logLevel
+        }
+    }
+
+    /**
+     * Sets the deadline of the call, which the server honours: it stops generating and fails the call with
+     * DEADLINE_EXCEEDED.
+     */
+    private fun GeneratorGrpcKt.GeneratorCoroutineStub.withTimeout(timeout: Duration?) =
+        if (timeout == null) this else withDeadlineAfter(timeout.toMillis(), TimeUnit.MILLISECONDS)
+
     override fun close() {
         channel.shutdown().awaitTermination(5, TimeUnit.SECONDS)
     }